@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from . import jobs
+from .models import DeadJob, Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'args', 'key', 'attempts', 'run_at')
+    search_fields = ('task', 'key')
+    empty_value_display = '-пусто-'
+
+
+@admin.register(DeadJob)
+class DeadJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'args', 'key', 'attempts', 'failed')
+    search_fields = ('task', 'key')
+    actions = ('retry',)
+    empty_value_display = '-пусто-'
+
+    def retry(self, request, queryset):
+        jobs.retry(list(queryset))
+    retry.short_description = 'Вернуть в очередь'
@@ -1,5 +1,32 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
+
+from yatube.settings import CACHES, DB_PROFILE, JOBS_ALWAYS_EAGER
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def check_jobs_cache(app_configs, **kwargs):
+    """Воркеры core.jobs сбрасывают кэш страниц (раскладка постов,
+    миниатюры). С locmem это память самого воркера: веб-процессы
+    сброса не увидят и будут отдавать старые страницы.
+    """
+    if JOBS_ALWAYS_EAGER or CACHES['default']['BACKEND'] != LOCMEM:
+        return []
+    return [checks.Error(
+        'Задачи выполняют воркеры (JOBS_ALWAYS_EAGER=0), а кэш - '
+        'в памяти процесса (CACHE_BACKEND=locmem).',
+        hint='Нужен общий кэш: CACHE_BACKEND=file, db или tiered.',
+        id='core.E001',
+    )]
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        checks.register(check_jobs_cache)
+        if DB_PROFILE == 'production':
+            from .sqlite import tune
+            connection_created.connect(tune, dispatch_uid='core.sqlite')
@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, в котором atomic() сразу берёт блокировку записи.
+
+    Обычный BEGIN откладывает её до первой записи, и если к этому
+    времени базу успел изменить другой писатель, SQLite в режиме WAL
+    отвечает «database is locked» сразу, не дожидаясь busy_timeout.
+    BEGIN IMMEDIATE ставит писателей в очередь в самом начале.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
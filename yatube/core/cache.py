@@ -0,0 +1,161 @@
+"""Двухуровневый кэш: L1 в памяти процесса поверх общего L2.
+
+L1 - LocMemCache своего воркера, L2 - общий для всех воркеров кэш
+(файлы или таблица в базе). Чтение идёт сначала в L1, потом в L2;
+запись и удаление - в оба уровня. Чужие воркеры узнают об изменениях
+не позже чем через L1_TIMEOUT секунд, а ключи с префиксами из
+L1_BYPASS (версии областей posts.caching) в L1 не кладутся вовсе:
+так сброс версии виден всем воркерам сразу, а ключи страниц
+после сброса просто другие.
+"""
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STATS = ('l1_hits', 'l2_hits', 'misses', 'sets', 'deletes')
+
+# Экземпляры бэкендов у Django свои в каждом потоке,
+# а статистика нужна по процессу целиком.
+_stats = dict.fromkeys(STATS, 0)
+_stats_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._local_alias = options.get('L1', 'local')
+        self._shared_alias = options.get('L2', 'shared')
+        self.local_timeout = options.get('L1_TIMEOUT', 5)
+        self.bypass = tuple(options.get('L1_BYPASS', ('version:',)))
+
+    @property
+    def local(self):
+        return caches[self._local_alias]
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @staticmethod
+    def _count(name, amount=1):
+        if amount:
+            with _stats_lock:
+                _stats[name] += amount
+
+    @staticmethod
+    def stats():
+        """Счётчики попаданий и промахов этого процесса."""
+        with _stats_lock:
+            return dict(_stats)
+
+    @staticmethod
+    def reset_stats():
+        with _stats_lock:
+            _stats.update(dict.fromkeys(STATS, 0))
+
+    def _cacheable_locally(self, key):
+        return not key.startswith(self.bypass)
+
+    def _timeout(self, timeout):
+        """Таймаут в секундах для L2: DEFAULT_TIMEOUT - наш собственный."""
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _local_timeout(self, timeout):
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        if self._cacheable_locally(key):
+            value = self.local.get(key, self, version=version)
+            if value is not self:
+                self._count('l1_hits')
+                return value
+        value = self.shared.get(key, self, version=version)
+        if value is self:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        if self._cacheable_locally(key):
+            self.local.set(key, value, self.local_timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        local_keys = [key for key in keys if self._cacheable_locally(key)]
+        found = self.local.get_many(local_keys, version=version)
+        self._count('l1_hits', len(found))
+        rest = [key for key in keys if key not in found]
+        if rest:
+            shared = self.shared.get_many(rest, version=version)
+            self._count('l2_hits', len(shared))
+            self._count('misses', len(rest) - len(shared))
+            self.local.set_many(
+                {key: value for key, value in shared.items()
+                 if self._cacheable_locally(key)},
+                self.local_timeout, version=version,
+            )
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._count('sets')
+        self.shared.set(key, value, self._timeout(timeout),
+                        version=version)
+        if self._cacheable_locally(key):
+            self.local.set(key, value, self._local_timeout(timeout),
+                           version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._count('sets', len(data))
+        failed = self.shared.set_many(
+            data, self._timeout(timeout), version=version)
+        self.local.set_many(
+            {key: value for key, value in data.items()
+             if self._cacheable_locally(key) and key not in failed},
+            self._local_timeout(timeout), version=version,
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, self._timeout(timeout),
+                                version=version)
+        if added:
+            self._count('sets')
+            self.local.delete(key, version=version)
+        return added
+
+    def delete(self, key, version=None):
+        self._count('deletes')
+        self.local.delete(key, version=version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._count('deletes', len(keys))
+        self.local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (self._cacheable_locally(key)
+                and self.local.has_key(key, version=version)
+                or self.shared.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout),
+                                 version=version)
+
+    def clear(self):
+        """Чистит свой L1 и общий L2 - то есть кэш всех воркеров."""
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
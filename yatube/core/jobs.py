@@ -0,0 +1,169 @@
+"""Фоновая очередь задач в таблице базы.
+
+enqueue(func, *args, key=...) кладёт строку Job в той же транзакции,
+что и данные, к которым она относится: воркер увидит её только после
+коммита, а при откате её не станет вместе с данными. Задачи выполняет
+manage.py run_workers - пул процессов, каждый берёт готовую задачу
+условным UPDATE и продлевает её run_at на время аренды.
+
+Упавшая задача откладывается с растущей паузой, после
+JOB_MAX_ATTEMPTS попыток переезжает в DeadJob. Задача с ключом
+не ставится второй раз, пока первая ждёт в очереди. Взятая воркером
+задача ключ отпускает до своего следующего повтора: она могла уже
+прочесть старые данные, и новая постановка не должна из-за неё
+пропасть. Поэтому функции задач пишутся так, чтобы повторный запуск
+ничего не портил.
+
+С JOBS_ALWAYS_EAGER (разработка, тесты) задача выполняется сразу
+при постановке, в этом же потоке.
+"""
+import json
+import logging
+import random
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from yatube.settings import (JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_SECONDS,
+                             JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS,
+                             JOBS_ALWAYS_EAGER)
+
+from .models import DeadJob, Job
+
+logger = logging.getLogger(__name__)
+
+# Сколько готовых задач смотреть за раз: соседний воркер мог успеть
+# взять первую, тогда пробуем следующую.
+CANDIDATES = 10
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """Ставит func(*args) в очередь. Аргументы - то, что ест json."""
+    job = Job(task=task_name(func), args=json.dumps(args), key=key,
+              run_at=timezone.now() + timedelta(seconds=delay))
+    if JOBS_ALWAYS_EAGER and not delay:
+        perform(job)
+        return job
+    Job.objects.bulk_create([job], ignore_conflicts=True)
+    return job
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой: 10 с, 20 с, 40 с... с разбросом,
+    чтобы упавшие разом задачи не вернулись тоже разом.
+    """
+    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                JOB_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def claim():
+    """Берёт одну готовую задачу или возвращает None."""
+    now = timezone.now()
+    for job in Job.objects.filter(run_at__lte=now)[:CANDIDATES]:
+        # Ключ снимается вместе со взятием, в job он остаётся для DeadJob.
+        taken = Job.objects.filter(pk=job.pk, run_at=job.run_at).update(
+            run_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            attempts=F('attempts') + 1, key=None)
+        if taken:
+            job.attempts += 1
+            return job
+    return None
+
+
+def perform(job):
+    """Выполняет задачу: удача удаляет её, ошибка откладывает
+    или хоронит в DeadJob. Возвращает True при удаче.
+    """
+    if job.attempts > JOB_MAX_ATTEMPTS:
+        # Воркер умер на последней попытке - больше не пробуем.
+        bury(job)
+        return False
+    # Задача из JOBS_ALWAYS_EAGER идёт внутри транзакции вида: точка
+    # сохранения откатит только её. Воркер же транзакцию не открывает,
+    # чтобы долгая задача не держала блокировку записи SQLite.
+    savepoint = transaction.atomic() if job.pk is None else nullcontext()
+    try:
+        with savepoint:
+            import_string(job.task)(*json.loads(job.args))
+    except Exception:
+        logger.exception('Задача %s упала (попытка %s)', job,
+                         job.attempts or 1)
+        fail(job, traceback.format_exc())
+        return False
+    if job.pk:
+        Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def fail(job, error):
+    job.last_error = error
+    job.attempts = max(job.attempts, 1)
+    if job.attempts >= JOB_MAX_ATTEMPTS:
+        return bury(job)
+    job.run_at = timezone.now() + backoff(job.attempts)
+    if job.pk:
+        # Ждущая повтора задача снова держит свой ключ.
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(
+                    run_at=job.run_at, last_error=error, key=job.key)
+        except IntegrityError:
+            # Пока она выполнялась, её поставили заново: повтор не нужен.
+            Job.objects.filter(pk=job.pk).delete()
+    else:
+        # Задача из JOBS_ALWAYS_EAGER: повторит её уже воркер.
+        Job.objects.bulk_create([job], ignore_conflicts=True)
+
+
+@transaction.atomic
+def bury(job):
+    DeadJob.objects.create(
+        task=job.task, args=job.args, key=job.key, attempts=job.attempts,
+        error=job.last_error or 'Аренда истекла: воркер не вернулся.',
+        created=job.created or timezone.now())
+    if job.pk:
+        Job.objects.filter(pk=job.pk).delete()
+
+
+def retry(dead_jobs):
+    """Возвращает задачи из DeadJob в очередь с нуля попыток."""
+    with transaction.atomic():
+        Job.objects.bulk_create([
+            Job(task=dead.task, args=dead.args, key=dead.key)
+            for dead in dead_jobs], ignore_conflicts=True)
+        DeadJob.objects.filter(
+            pk__in=[dead.pk for dead in dead_jobs]).delete()
+
+
+def work(burst=False, poll=1.0, stopping=lambda: False):
+    """Цикл воркера. burst - выйти, когда готовых задач не осталось.
+    Возвращает число выполненных задач.
+    """
+    done = 0
+    while not stopping():
+        try:
+            job = claim()
+        except DatabaseError:
+            # База занята или недоступна: воркер не падает, а ждёт.
+            if burst:
+                raise
+            logger.exception('Очередь задач недоступна')
+            job = None
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        done += perform(job)
+    return done
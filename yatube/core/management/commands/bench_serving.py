@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from posts.management.commands.bench_views import percentile
+from yatube.asgi import WsgiToAsgi
+
+# Не 127.0.0.1, иначе django-debug-toolbar встроится в ответы.
+CLIENT_ADDR = '192.0.2.1'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def get_environ(self):
+        environ = super().get_environ()
+        environ['REMOTE_ADDR'] = CLIENT_ADDR
+        return environ
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """Синхронный сервер с фиксированным числом потоков, как sync-воркеры
+    gunicorn: соединение занимает поток от первого байта до последнего.
+    """
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.work, request, client_address)
+
+    def work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+class AsgiServer:
+    """Минимальный HTTP/1.0-сервер на asyncio для ASGI-приложения."""
+
+    def __init__(self, application):
+        self.application = application
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(
+            self.handle, '127.0.0.1', 0))
+        self.server_address = self.server.sockets[0].getsockname()
+
+    def serve_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def server_close(self):
+        self.server.close()
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, _ = (await reader.readline()).decode(
+                'latin-1').split(' ', 2)
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'),
+                                value.strip().encode('latin-1')))
+            length = int(dict(headers).get(b'content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http', 'http_version': '1.0', 'method': method,
+                'scheme': 'http', 'path': path, 'root_path': '',
+                'query_string': query.encode('latin-1'), 'headers': headers,
+                'server': self.server_address, 'client': (CLIENT_ADDR, 0),
+            }
+            messages = [{'type': 'http.request', 'body': body}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    writer.write(
+                        f'HTTP/1.0 {message["status"]} -\r\n'.encode())
+                    for name, value in message['headers']:
+                        writer.write(name + b': ' + value + b'\r\n')
+                    writer.write(b'\r\n')
+                else:
+                    writer.write(message.get('body', b''))
+                await writer.drain()
+
+            await self.application(scope, receive, send)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def request(port, path, trickle=0.0):
+    """Один запрос; trickle - пауза между байтами, как у медленного
+    мобильного клиента. Возвращает статус и время ответа.
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        raw = (f'GET {path} HTTP/1.0\r\nHost: localhost\r\n'
+               f'Connection: close\r\n\r\n').encode()
+        if trickle:
+            for byte in range(len(raw)):
+                writer.write(raw[byte:byte + 1])
+                await writer.drain()
+                await asyncio.sleep(trickle)
+        else:
+            writer.write(raw)
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response else 0
+    return status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает на одной машине WSGI-сервер с пулом потоков '
+            'и yatube.asgi с таким же пулом: быстрые клиенты читают '
+            'страницу, пока медленные держат соединения открытыми.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Потоков у обоих серверов.')
+        parser.add_argument('--fast', type=int, default=8,
+                            help='Быстрых клиентов одновременно.')
+        parser.add_argument('--slow', type=int, default=8,
+                            help='Медленных клиентов одновременно.')
+        parser.add_argument('--trickle', type=float, default=0.05,
+                            help='Пауза медленного клиента между байтами.')
+        parser.add_argument('--seconds', type=float, default=10)
+
+    def handle(self, *args, **options):
+        wsgi = get_wsgi_application()
+        servers = {
+            'wsgi': lambda: self.wsgi_server(wsgi, options['threads']),
+            'asgi': lambda: AsgiServer(WsgiToAsgi(wsgi, options['threads'])),
+        }
+        self.stdout.write(f'{"сервер":<8}{"запросы/с":>11}{"p50":>9}'
+                          f'{"p95":>9}{"ошибки":>8}{"медленные":>11}')
+        for name, make_server in servers.items():
+            # Оба сервера начинают с пустым кэшем страниц.
+            cache.clear()
+            server = make_server()
+            thread = threading.Thread(target=server.serve_forever,
+                                      daemon=True)
+            thread.start()
+            try:
+                result = asyncio.run(self.load(
+                    server.server_address[1], options))
+            finally:
+                server.shutdown()
+                thread.join()
+                server.server_close()
+            self.report(name, result, options['seconds'])
+
+    def wsgi_server(self, application, threads):
+        server = PooledWSGIServer(('127.0.0.1', 0), threads)
+        server.set_app(application)
+        return server
+
+    async def load(self, port, options):
+        deadline = time.perf_counter() + options['seconds']
+        fast, slow, errors = [], [], [0]
+
+        async def client(timings, trickle):
+            while time.perf_counter() < deadline:
+                try:
+                    status, duration = await request(
+                        port, options['path'], trickle)
+                except OSError:
+                    status, duration = 0, 0
+                if status == 200:
+                    timings.append(duration * 1000)
+                else:
+                    errors[0] += 1
+
+        await asyncio.gather(
+            *(client(fast, 0) for _ in range(options['fast'])),
+            *(client(slow, options['trickle'])
+              for _ in range(options['slow'])))
+        return sorted(fast), len(slow), errors[0]
+
+    def report(self, name, result, seconds):
+        timings, slow, errors = result
+        self.stdout.write(
+            f'{name:<8}{len(timings) / seconds:>11.1f}'
+            f'{percentile(timings, 0.50) or 0:>9.1f}'
+            f'{percentile(timings, 0.95) or 0:>9.1f}{errors:>8}{slow:>11}')
@@ -0,0 +1,65 @@
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core import profiling
+from yatube.settings import PROFILING_DIR
+
+
+class Command(BaseCommand):
+    help = ('Сводит сохранённые профили запросов: самые затратные функции '
+            'и общий файл collapsed stacks для flamegraph.pl/speedscope.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=PROFILING_DIR,
+                            help='Каталог с профилями.')
+        parser.add_argument('--view',
+                            help='Только профили этого view, например '
+                                 'posts:index.')
+        parser.add_argument('--output',
+                            help='Куда записать объединённые стеки.')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Сколько функций показать.')
+
+    def merge(self, directory, view):
+        """Стеки всех подходящих профилей и число профилей по view."""
+        prefix = view and view.replace(':', '-') + '.'
+        stacks, views = Counter(), Counter()
+        for entry in profiling.profiles(directory):
+            if prefix and not entry.name.startswith(prefix):
+                continue
+            views[entry.name.split('.', 1)[0]] += 1
+            stacks.update(profiling.read(entry.path))
+        return stacks, views
+
+    def handle(self, *args, **options):
+        stacks, views = self.merge(options['dir'], options['view'])
+        total = sum(stacks.values())
+        if not total:
+            self.stdout.write('Профилей нет')
+            return
+        self.stdout.write(f'Профилей: {sum(views.values())}, '
+                          f'сэмплов: {total}')
+        for view, count in views.most_common():
+            self.stdout.write(f'  {view}: {count}')
+        self.write_top(stacks, total, options['top'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                for stack, count in stacks.most_common():
+                    file.write(f'{stack} {count}\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'\nОбъединённые стеки: {os.path.abspath(options["output"])}'))
+
+    def write_top(self, stacks, total, top):
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        for title, counter in (('Собственное время', own),
+                               ('Вместе с вызванными', inclusive)):
+            self.stdout.write(f'\n{title}:')
+            for frame, count in counter.most_common(top):
+                self.stdout.write(f'{count / total:7.1%}  {frame}')
@@ -0,0 +1,66 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+from yatube.settings import JOB_WORKERS
+
+
+def worker(burst, poll, done):
+    """Тело дочернего процесса: берёт задачи, пока его не остановят.
+    По SIGTERM и Ctrl+C дорабатывает текущую задачу и выходит.
+    """
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stopping.set())
+    try:
+        count = jobs.work(burst, poll, stopping.is_set)
+        with done.get_lock():
+            done.value += count
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди core.jobs '
+            'в пуле процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=JOB_WORKERS,
+            help='Сколько процессов-воркеров; 0 - в этом процессе.')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда готовых задач не останется.')
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, секунд.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            done = jobs.work(options['burst'], options['poll'])
+        else:
+            done = self.run_pool(options)
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+
+    def run_pool(self, options):
+        # Дочерние процессы - копии этого: соединения закрываем заранее,
+        # чтобы ни одно не досталось им по наследству.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        done = context.Value('i', 0)
+        processes = [context.Process(target=worker, args=(
+            options['burst'], options['poll'], done))
+            for _ in range(options['processes'])]
+        for process in processes:
+            process.start()
+        # Ctrl+C получает вся группа процессов, а SIGTERM передаём сами.
+        signal.signal(signal.SIGTERM, lambda *args: [
+            process.terminate() for process in processes])
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for process in processes:
+            process.join()
+        return done.value
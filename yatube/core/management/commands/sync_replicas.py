@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replicas import PRIMARY
+from yatube.settings import DATABASE_REPLICAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICA_PATHS - локальная замена репликации.')
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Реплики копируются только для SQLite.')
+        if not DATABASE_REPLICAS:
+            self.stdout.write('Реплики не заданы (DATABASE_REPLICA_PATHS).')
+            return
+        primary.ensure_connection()
+        for alias in DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # Онлайн-копия: писать в основную базу можно и во время неё.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: скопирована')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
@@ -0,0 +1,198 @@
+"""Метрики запросов в памяти процесса.
+
+MetricsMiddleware открывает на каждый запрос RequestRecord, куда
+складываются время SQL, шаблонов и попадания в кэш, а по окончании
+раскладывает итог по гистограммам с меткой view - имени маршрута
+вроде posts:index. Гистограммы отдаются по /metrics в текстовом
+формате Prometheus. У каждого воркера они свои: Prometheus собирает
+их с каждого процесса отдельно и складывает сам.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+_local = threading.local()
+
+
+class RequestRecord:
+    """Что набралось за один запрос."""
+
+    def __init__(self, top_queries):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.top_queries = top_queries
+        self._slowest = []
+
+    def add_query(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        # Держим только самые долгие запросы, а не все подряд.
+        item = (duration, self.sql_count, sql)
+        if len(self._slowest) < self.top_queries:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest(self):
+        return [(sql, duration)
+                for duration, _, sql in sorted(self._slowest, reverse=True)]
+
+
+def begin(top_queries):
+    _local.record = RequestRecord(top_queries)
+    return _local.record
+
+
+def end():
+    _local.record = None
+
+
+def current():
+    """Запись текущего запроса или None вне MetricsMiddleware."""
+    return getattr(_local, 'record', None)
+
+
+def count_cache(hits, misses):
+    record = current()
+    if record is not None:
+        record.cache_hits += hits
+        record.cache_misses += misses
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(
+                key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count)
+                        for key, (counts, total, count)
+                        in self._series.items()}
+        lines = [f'# HELP {self.name} {self.help_text}',
+                 f'# TYPE {self.name} histogram']
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, amount in zip(self.buckets, counts):
+                cumulative += amount
+                lines.append(f'{self.name}_bucket'
+                             f'{_labels(key, le=_number(bound))} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(key, le="+Inf")} '
+                         f'{count}')
+            lines.append(f'{self.name}_sum{_labels(key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(key)} {count}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            snapshot = dict(self._series)
+        lines = [f'# HELP {self.name} {self.help_text}',
+                 f'# TYPE {self.name} counter']
+        lines.extend(f'{self.name}{_labels(key)} {_number(value)}'
+                     for key, value in sorted(snapshot.items()))
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"')
+               .replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value
+                          in zip(pairs, escaped)) + '}'
+
+
+REQUESTS = Counter('yatube_requests_total', 'Запросы по view и статусу.')
+DURATION = Histogram('yatube_request_duration_seconds',
+                     'Полное время ответа.', SECONDS)
+SQL_QUERIES = Histogram('yatube_request_sql_queries',
+                        'Число SQL-запросов на ответ.', QUERIES)
+SQL_DURATION = Histogram('yatube_request_sql_seconds',
+                         'Время SQL-запросов на ответ.', SECONDS)
+TEMPLATE_DURATION = Histogram('yatube_request_template_seconds',
+                              'Время отрисовки шаблонов на ответ.', SECONDS)
+RESPONSE_SIZE = Histogram('yatube_response_size_bytes',
+                          'Размер тела ответа.', BYTES)
+CACHE_HITS = Counter('yatube_cache_hits_total',
+                     'Попадания в кэш страниц, карточек и версий.')
+CACHE_MISSES = Counter('yatube_cache_misses_total',
+                       'Промахи мимо кэша страниц, карточек и версий.')
+METRICS = (REQUESTS, DURATION, SQL_QUERIES, SQL_DURATION, TEMPLATE_DURATION,
+           RESPONSE_SIZE, CACHE_HITS, CACHE_MISSES)
+
+
+def observe(view, status, record, duration, size):
+    labels = {'view': view}
+    REQUESTS.inc({'view': view, 'status': status})
+    DURATION.observe(labels, duration)
+    SQL_QUERIES.observe(labels, record.sql_count)
+    SQL_DURATION.observe(labels, record.sql_time)
+    TEMPLATE_DURATION.observe(labels, record.template_time)
+    if size is not None:
+        RESPONSE_SIZE.observe(labels, size)
+    CACHE_HITS.inc(labels, record.cache_hits)
+    CACHE_MISSES.inc(labels, record.cache_misses)
+
+
+def exposition():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in METRICS:
+        metric.clear()
@@ -0,0 +1,131 @@
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from yatube.settings import (DATABASE_REPLICAS, METRICS_SLOW_MS,
+                             METRICS_TOP_QUERIES, PROFILING, PROFILING_DIR,
+                             PROFILING_INTERVAL_MS, PROFILING_MAX_BYTES,
+                             PROFILING_RATE, PROFILING_THRESHOLD_MS,
+                             REPLICA_COOKIE, REPLICA_PIN_SECONDS)
+
+from . import metrics, profiling, replicas
+
+logger = logging.getLogger('yatube.slow')
+
+
+class MetricsMiddleware:
+    """Меряет каждый запрос и складывает итог в core.metrics.
+    Стоит первым в MIDDLEWARE, чтобы в замер попали и сессии,
+    и аутентификация.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        record = metrics.begin(METRICS_TOP_QUERIES)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.time_query))
+                response = self.get_response(request)
+            duration = time.perf_counter() - record.started
+            self.observe(request, response, record, duration)
+        finally:
+            metrics.end()
+        return response
+
+    @staticmethod
+    def time_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            record = metrics.current()
+            if record is not None:
+                record.add_query(sql, time.perf_counter() - started)
+
+    def observe(self, request, response, record, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        metrics.observe(view, response.status_code, record, duration, size)
+        if duration * 1000 >= METRICS_SLOW_MS:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.0f мс, SQL %d за %.0f мс, '
+                'шаблоны %.0f мс, кэш %d/%d\n%s',
+                request.method, request.get_full_path(), view,
+                duration * 1000, record.sql_count, record.sql_time * 1000,
+                record.template_time * 1000, record.cache_hits,
+                record.cache_hits + record.cache_misses,
+                '\n'.join(f'  {seconds * 1000:.1f} мс: {sql}'
+                          for sql, seconds in record.slowest()),
+            )
+
+
+class ProfilingMiddleware:
+    """Снимает стековый профиль с доли PROFILING_RATE запросов
+    и с любого запроса дольше PROFILING_THRESHOLD_MS. Включается
+    переменной окружения PROFILING, иначе Django её не подключает.
+    """
+
+    def __init__(self, get_response):
+        if not PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sampler = profiling.StackSampler(PROFILING_INTERVAL_MS / 1000)
+
+    def __call__(self, request):
+        sampled = random.random() < PROFILING_RATE
+        # Медленный ли запрос, выяснится только в конце, поэтому
+        # при включённом пороге сэмплируем все.
+        if not sampled and not PROFILING_THRESHOLD_MS:
+            return self.get_response(request)
+        thread_id = threading.get_ident()
+        started = time.perf_counter()
+        self.sampler.start(thread_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = self.sampler.stop(thread_id)
+        duration = time.perf_counter() - started
+        slow = (PROFILING_THRESHOLD_MS
+                and duration * 1000 >= PROFILING_THRESHOLD_MS)
+        if stacks and (sampled or slow):
+            match = getattr(request, 'resolver_match', None)
+            profiling.save(PROFILING_DIR,
+                           match.view_name if match else 'unresolved',
+                           stacks, duration)
+            profiling.enforce_retention(PROFILING_DIR, PROFILING_MAX_BYTES)
+        return response
+
+
+class ReplicaMiddleware:
+    """Пускает безопасные запросы читать с реплик (core.replicas).
+    После записи ставит куку REPLICA_COOKIE, и пока она жива, запросы
+    читателя читают из default. Без реплик Django её не подключает.
+    """
+
+    def __init__(self, get_response):
+        if not DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas.begin(request.method in ('GET', 'HEAD', 'OPTIONS')
+                       and REPLICA_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if replicas.wrote():
+                response.set_cookie(REPLICA_COOKIE, '1',
+                                    max_age=REPLICA_PIN_SECONDS,
+                                    httponly=True, samesite='Lax')
+        finally:
+            replicas.end()
+        return response
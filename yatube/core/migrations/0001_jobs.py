@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200, verbose_name='Функция')),
+                ('args', models.TextField(default='[]', verbose_name='Аргументы (JSON)')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='Ключ идемпотентности')),
+                ('attempts', models.PositiveIntegerField(verbose_name='Попыток')),
+                ('error', models.TextField(verbose_name='Ошибка')),
+                ('created', models.DateTimeField(verbose_name='Поставлена')),
+                ('failed', models.DateTimeField(auto_now_add=True, verbose_name='Сдалась')),
+            ],
+            options={
+                'verbose_name': 'Неудавшаяся задача',
+                'verbose_name_plural': 'Неудавшиеся задачи',
+                'ordering': ('-failed', '-id'),
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=200, verbose_name='Функция')),
+                ('args', models.TextField(default='[]', verbose_name='Аргументы (JSON)')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name='Ключ идемпотентности')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Выполнить после')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена')),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ('run_at', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['run_at', 'id'], name='job_run_at_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (core.jobs).
+
+    Взятая воркером задача не блокируется отдельно: её run_at
+    сдвигается на время аренды, и если воркер умер, задача по
+    истечении аренды снова становится готовой. Ключ есть только
+    у ждущих задач: взятая его отпускает.
+    """
+    task = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы (JSON)', default='[]')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        blank=True,
+        null=True,
+        unique=True,
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=('run_at', 'id'), name='job_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task}{self.args}'
+
+
+class DeadJob(models.Model):
+    """Задача, исчерпавшая JOB_MAX_ATTEMPTS попыток."""
+    task = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы (JSON)', default='[]')
+    key = models.CharField('Ключ идемпотентности', max_length=200,
+                           blank=True, null=True)
+    attempts = models.PositiveIntegerField('Попыток')
+    error = models.TextField('Ошибка')
+    created = models.DateTimeField('Поставлена')
+    failed = models.DateTimeField('Сдалась', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-failed', '-id')
+        verbose_name = 'Неудавшаяся задача'
+        verbose_name_plural = 'Неудавшиеся задачи'
+
+    def __str__(self):
+        return f'{self.task}{self.args}'
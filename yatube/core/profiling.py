@@ -0,0 +1,129 @@
+"""Выборочное профилирование запросов стековым сэмплером.
+
+Пока запрос профилируется, фоновый поток каждые несколько
+миллисекунд снимает стек его потока через sys._current_frames()
+и считает одинаковые стеки. Сам запрос при этом не замедляется
+трассировкой, как под cProfile. Сохранённый профиль - это файл
+в формате collapsed stacks («кадр;кадр;кадр число»), который
+понимают flamegraph.pl и speedscope. Имя файла - view и время.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.utils import timezone
+
+SUFFIX = '.folded'
+
+_package_roots = sorted(
+    {os.path.dirname(os.path.dirname(os.__file__))}
+    | {path for path in sys.path if path and os.path.isdir(path)},
+    key=len, reverse=True,
+)
+
+
+def _short(filename):
+    for root in _package_roots:
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+def collapse(frame):
+    """Стек кадра одной строкой, от корня к вершине."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{_short(code.co_filename)}:{code.co_name}'
+                     .replace(';', ':').replace(' ', '_'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Один поток-сэмплер на процесс, профили - по id потоков."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+def save(directory, view, stacks, duration):
+    """Пишет профиль в файл «view.время.длительность.folded»."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S.%f')
+    name = (f'{view.replace(":", "-").replace(os.sep, "-")}.{stamp}.'
+            f'{duration * 1000:.0f}ms{SUFFIX}')
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as file:
+        for stack, count in stacks.most_common():
+            file.write(f'{stack} {count}\n')
+    return path
+
+
+def profiles(directory):
+    """Сохранённые профили, от старых к новым."""
+    if not os.path.isdir(directory):
+        return []
+    entries = [entry for entry in os.scandir(directory)
+               if entry.is_file() and entry.name.endswith(SUFFIX)]
+    return sorted(entries, key=lambda entry: entry.stat().st_mtime)
+
+
+def enforce_retention(directory, max_bytes):
+    """Удаляет самые старые профили, пока все вместе больше max_bytes."""
+    entries = profiles(directory)
+    total = sum(entry.stat().st_size for entry in entries)
+    removed = 0
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        total -= entry.stat().st_size
+        os.remove(entry.path)
+        removed += 1
+    return removed
+
+
+def read(path):
+    stacks = Counter()
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
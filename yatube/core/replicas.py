@@ -0,0 +1,93 @@
+"""Чтение с реплик базы.
+
+Пишем всегда в default, а читать безопасные запросы (GET без следа
+недавней записи) могут с любой реплики из DATABASE_REPLICAS. Реплика
+отстаёт от основной базы, поэтому запрос, который что-то записал,
+дочитывает из default до конца, а ReplicaMiddleware ставит читателю
+куку: ещё REPLICA_PIN_SECONDS его запросы читают из default и видят
+свою запись (read-your-writes). Вне запросов - в командах, сигналах
+фоновых потоков - всё идёт в default. Сессии, пользователи и очередь
+задач всегда читаются из default, как и страницы, которые кладутся
+в кэш (posts.caching.cached_page).
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from yatube.settings import DATABASE_REPLICAS
+
+PRIMARY = 'default'
+# Таблица DatabaseCache: версии областей с реплики были бы старыми,
+# а запись в кэш - не повод держать читателя на default.
+CACHE_APP = 'django_cache'
+# Всегда из default: сессия и пользователь только что входившего
+# читателя, типы контента и очередь задач (core) на отстающей реплике
+# могут ещё не существовать.
+PRIMARY_APPS = {CACHE_APP, 'sessions', 'auth', 'contenttypes', 'core'}
+
+_local = threading.local()
+
+
+def begin(use_replicas):
+    """Начало запроса: можно ли ему читать с реплик."""
+    _local.replicas = use_replicas
+    _local.wrote = False
+
+
+def end():
+    _local.replicas = False
+    _local.wrote = False
+
+
+def pin():
+    """Дальше в этом потоке читаем из default и запоминаем запись."""
+    _local.replicas = False
+    _local.wrote = True
+
+
+def wrote():
+    return getattr(_local, 'wrote', False)
+
+
+@contextmanager
+def primary():
+    """Временно читать из default, не ставя куку записи."""
+    previous = getattr(_local, 'replicas', False)
+    _local.replicas = False
+    try:
+        yield
+    finally:
+        # Запись внутри блока закрепляет поток за default насовсем.
+        _local.replicas = previous and not wrote()
+
+
+def use_primary(view):
+    """View, которое пишет: все его чтения - из default."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pin()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    replicas = DATABASE_REPLICAS
+
+    def db_for_read(self, model, **hints):
+        if (self.replicas and getattr(_local, 'replicas', False)
+                and model._meta.app_label not in PRIMARY_APPS):
+            return random.choice(self.replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != CACHE_APP:
+            pin()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты с них связываются как свои.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,30 @@
+"""Настройки соединений SQLite для боевого профиля (DB_PROFILE=production).
+
+WAL пускает читателей параллельно с писателем: запись идёт в журнал,
+а читатели видят последний зафиксированный снимок. При WAL хватает
+synchronous=NORMAL - база не портится при сбое, теряется разве что
+последняя транзакция при отключении питания. busy_timeout заставляет
+писателя подождать занятую базу, а не сразу падать с «database is
+locked». mmap и кэш страниц держат горячие индексы в памяти.
+"""
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),
+    ('mmap_size', 256 * 1024 * 1024),
+    # Отрицательное значение - размер в килобайтах, а не в страницах.
+    ('cache_size', -64 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def apply_pragmas(connection, pragmas=PRAGMAS):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in pragmas:
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def tune(sender, connection, **kwargs):
+    """Приёмник connection_created."""
+    apply_pragmas(connection)
@@ -0,0 +1,32 @@
+"""Шаблоны Django с замером времени отрисовки для core.metrics."""
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        record = metrics.current()
+        if record is None:
+            return super().render(context, request)
+        # Вложенные шаблоны (карточки, include через render_to_string)
+        # уже входят во время внешнего - считаем только его.
+        record.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_depth -= 1
+            if not record.template_depth:
+                record.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -6,3 +6,14 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def is_portrait(image):
+    """Портретная ли картинка поста - по размерам, сохранённым в посте.
+    Сам файл не открывается.
+    """
+    post = getattr(image, 'instance', None)
+    width = getattr(post, 'image_width', None)
+    height = getattr(post, 'image_height', None)
+    return bool(width and height and height > width)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from yatube.asgi import WsgiToAsgi
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, которое отвечает тем, что получило."""
+    body = environ['wsgi.input'].read()
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    return [f'{environ["REQUEST_METHOD"]} {environ["PATH_INFO"]} '
+            f'{environ["QUERY_STRING"]} {environ.get("HTTP_X_TEST")} '
+            f'{environ.get("CONTENT_TYPE")} '.encode('latin-1'), body]
+
+
+class AsgiAdapterTests(SimpleTestCase):
+    def setUp(self):
+        self.application = WsgiToAsgi(echo, threads=2)
+
+    def call(self, method='GET', path='/', body=b'', headers=()):
+        messages = [{'type': 'http.request', 'body': body[:3],
+                     'more_body': True},
+                    {'type': 'http.request', 'body': body[3:]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path,
+                 'query_string': b'a=1', 'headers': list(headers),
+                 'server': ('testserver', 80), 'client': ('192.0.2.1', 1)}
+        asyncio.run(self.application(scope, receive, send))
+        return sent[0], b''.join(message.get('body', b'')
+                                 for message in sent[1:])
+
+    def test_request_passes_to_wsgi(self):
+        """Тело из нескольких сообщений, путь и заголовки доходят
+        до WSGI-приложения, ответ - обратно.
+        """
+        start, body = self.call(
+            'POST', '/путь/', b'text=hello',
+            headers=[(b'x-test', b'yes'),
+                     (b'content-type', b'application/x-www-form-urlencoded')])
+        self.assertEqual(start['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), start['headers'])
+        self.assertEqual(
+            body.decode('latin-1'),
+            'POST ' + '/путь/'.encode().decode('latin-1')
+            + ' a=1 yes application/x-www-form-urlencoded text=hello')
+
+    def test_repeated_headers(self):
+        """Куки из нескольких заголовков склеиваются через «; »,
+        остальные повторы - через запятую.
+        """
+        environ = self.application.environ({
+            'method': 'GET', 'path': '/', 'headers': [
+                (b'cookie', b'sessionid=abc'), (b'cookie', b'primary=1'),
+                (b'accept', b'text/html'), (b'accept', b'*/*')]}, None)
+        self.assertEqual(environ['HTTP_COOKIE'], 'sessionid=abc; primary=1')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+
+    def test_head_has_no_body(self):
+        start, body = self.call('HEAD')
+        self.assertEqual(start['status'], 201)
+        self.assertEqual(body, b'')
+
+    def test_media_served_without_django(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with open(os.path.join(media, 'pic.png'), 'wb') as file:
+            file.write(b'png' * 100000)
+        with mock.patch.multiple('yatube.asgi', DEBUG=True,
+                                 MEDIA_ROOT=media, MEDIA_URL='/media/'):
+            start, body = self.call(path='/media/pic.png')
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'image/png'), start['headers'])
+            self.assertEqual(body, b'png' * 100000)
+            start, _ = self.call(path='/media/../../etc/passwd')
+            self.assertEqual(start['status'], 201)
@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {'L1': 'local', 'L2': 'shared', 'L1_TIMEOUT': 60},
+    },
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+              'LOCATION': 'tiered-test'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+})
+class TieredCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_reads_go_through_both_tiers(self):
+        """Запись видна в L2, повторное чтение берётся из L1."""
+        self.cache.set('page', 'html')
+        self.assertEqual(caches['shared'].get('page'), 'html')
+        caches['local'].clear()
+        self.assertEqual(self.cache.get('page'), 'html')
+        self.assertEqual(self.cache.get('page'), 'html')
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual(
+            (stats['l1_hits'], stats['l2_hits'], stats['misses']), (1, 1, 1))
+
+    def test_other_worker_change_is_seen(self):
+        """Ключи версий читаются мимо L1, поэтому сброс виден сразу."""
+        self.cache.set('version:posts', 1)
+        self.cache.set('page', 'старая')
+        caches['shared'].set('version:posts', 2)
+        caches['shared'].set('page', 'новая')
+        self.assertEqual(self.cache.get('version:posts'), 2)
+        self.assertEqual(self.cache.get('page'), 'старая')
+
+    def test_clear_reaches_shared_tier(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.clear()
+        self.assertEqual(caches['shared'].get_many(['a', 'b']), {})
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.apps import LOCMEM, check_jobs_cache
+from core.models import DeadJob, Job
+from posts import feed, follows
+from posts.models import FeedEntry, Follow, Post, User
+from yatube.settings import JOB_MAX_ATTEMPTS
+
+calls = []
+
+
+def record(*args):
+    calls.append(args)
+
+
+def explode(*args):
+    Follow.objects.all().delete()
+    raise RuntimeError('сломалось')
+
+
+@mock.patch('core.jobs.JOBS_ALWAYS_EAGER', False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_work(self):
+        """Задача ждёт воркера, выполняется и пропадает из очереди."""
+        jobs.enqueue(record, 1, 'два')
+        self.assertEqual(calls, [])
+        self.assertEqual(jobs.work(burst=True), 1)
+        self.assertEqual(calls, [(1, 'два')])
+        self.assertFalse(Job.objects.exists())
+
+    def test_idempotency_key(self):
+        """Задача с тем же ключом не ставится, пока первая ждёт."""
+        jobs.enqueue(record, 1, key='одна')
+        jobs.enqueue(record, 2, key='одна')
+        jobs.work(burst=True)
+        self.assertEqual(calls, [(1,)])
+        jobs.enqueue(record, 3, key='одна')
+        jobs.work(burst=True)
+        self.assertEqual(calls, [(1,), (3,)])
+
+    def test_claimed_job_releases_key(self):
+        """Пока задача выполняется, такую же можно поставить снова:
+        взятая могла прочесть данные до новой правки.
+        """
+        jobs.enqueue(record, 1, key='одна')
+        self.assertEqual(jobs.claim().key, 'одна')
+        jobs.enqueue(record, 2, key='одна')
+        jobs.enqueue(record, 3, key='одна')
+        self.assertEqual(Job.objects.filter(key='одна').count(), 1)
+        self.assertEqual(jobs.work(burst=True), 1)
+        self.assertEqual(calls, [(2,)])
+
+    def test_failed_job_takes_key_back(self):
+        """Упавшая задача ждёт повтора со своим ключом, а если её уже
+        поставили заново - просто уходит.
+        """
+        jobs.enqueue(explode, key='взрыв')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        self.assertEqual(Job.objects.get().key, 'взрыв')
+        Job.objects.update(run_at=timezone.now())
+        job = jobs.claim()
+        jobs.enqueue(explode, key='взрыв')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.perform(job)
+        self.assertEqual(Job.objects.get().attempts, 0)
+
+    def test_delay(self):
+        jobs.enqueue(record, 1, delay=60)
+        self.assertEqual(jobs.work(burst=True), 0)
+        self.assertEqual(calls, [])
+
+    def test_claimed_job_is_leased(self):
+        """Взятую задачу другой воркер не получит до конца аренды."""
+        jobs.enqueue(record)
+        self.assertIsNotNone(jobs.claim())
+        self.assertIsNone(jobs.claim())
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.claim().attempts, 2)
+
+    def test_retry_with_backoff_then_dead_letter(self):
+        """Упавшая задача откладывается всё дальше, потом - в DeadJob."""
+        jobs.enqueue(explode, key='взрыв')
+        delays = []
+        with self.assertLogs('core.jobs', 'ERROR'):
+            for _ in range(JOB_MAX_ATTEMPTS - 1):
+                started = timezone.now()
+                self.assertEqual(jobs.work(burst=True), 0)
+                job = Job.objects.get()
+                self.assertIn('сломалось', job.last_error)
+                delays.append(job.run_at - started)
+                job.run_at = timezone.now()
+                job.save()
+            jobs.work(burst=True)
+        self.assertEqual(delays, sorted(delays))
+        self.assertGreater(delays[0], timedelta(0))
+        self.assertFalse(Job.objects.exists())
+        dead = DeadJob.objects.get()
+        self.assertEqual((dead.key, dead.attempts),
+                         ('взрыв', JOB_MAX_ATTEMPTS))
+
+        jobs.retry([dead])
+        self.assertEqual(Job.objects.get().attempts, 0)
+        self.assertFalse(DeadJob.objects.exists())
+
+    def test_command(self):
+        jobs.enqueue(record, 1)
+        out = StringIO()
+        call_command('run_workers', '--processes=0', '--burst', stdout=out)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+
+    def test_fan_out_runs_in_worker(self):
+        """Новый пост попадает в ленты подписчиков через очередь."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(text='в очередь', author=author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(Job.objects.get().task, jobs.task_name(feed.fan_out))
+        jobs.work(burst=True)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=reader, post=post).exists())
+
+    def test_worker_refreshes_cached_feeds(self):
+        """Лента, закэшированная до прихода воркера, обновляется,
+        когда он разложит пост или дозаполнит ленту подпиской.
+        """
+        author = User.objects.create_user(username='author')
+        other = User.objects.create_user(username='other')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        client = Client()
+        client.force_login(reader)
+        cache.clear()
+        url = reverse('posts:follow_index')
+        Post.objects.create(text='из очереди', author=author)
+        self.assertNotContains(client.get(url), 'из очереди')
+        jobs.work(burst=True)
+        self.assertContains(client.get(url), 'из очереди')
+
+        Post.objects.create(text='до подписки', author=other)
+        jobs.work(burst=True)
+        follows.follow_many(reader, [other])
+        self.assertNotContains(client.get(url), 'до подписки')
+        jobs.work(burst=True)
+        self.assertContains(client.get(url), 'до подписки')
+
+
+class EagerJobTests(TestCase):
+    def test_failure_keeps_outer_transaction(self):
+        """В режиме JOBS_ALWAYS_EAGER упавшая задача откатывает только
+        себя и уходит в очередь на повтор.
+        """
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        with mock.patch('core.jobs.JOBS_ALWAYS_EAGER', True):
+            with transaction.atomic():
+                Follow.objects.create(user=reader, author=author)
+                with self.assertLogs('core.jobs', 'ERROR'):
+                    jobs.enqueue(explode)
+                self.assertTrue(Follow.objects.exists())
+        self.assertEqual(Job.objects.get().attempts, 1)
+
+
+class JobsCacheCheckTests(TestCase):
+    def test_workers_need_shared_cache(self):
+        """Воркеры с кэшем в памяти процесса - ошибка проверки."""
+        locmem = {'default': {'BACKEND': LOCMEM}}
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'}}
+        with mock.patch('core.apps.JOBS_ALWAYS_EAGER', False):
+            with mock.patch('core.apps.CACHES', locmem):
+                self.assertEqual([error.id for error in
+                                  check_jobs_cache(None)], ['core.E001'])
+            with mock.patch('core.apps.CACHES', shared):
+                self.assertEqual(check_jobs_cache(None), [])
+        with mock.patch('core.apps.CACHES', locmem):
+            self.assertEqual(check_jobs_cache(None), [])
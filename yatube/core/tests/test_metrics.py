@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tim')
+        cls.staff = User.objects.create_user(username='admin', is_staff=True)
+        cls.post = Post.objects.create(text='тестовый', author=cls.user)
+
+    def setUp(self):
+        metrics.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def scrape(self):
+        response = self.staff_client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_is_measured_by_view_name(self):
+        """Запрос раскладывается по гистограммам с именем маршрута."""
+        Client().get(reverse('posts:index'))
+        text = self.scrape()
+        for line in (
+            'yatube_requests_total{status="200",view="posts:index"} 1',
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            'yatube_request_template_seconds_count{view="posts:index"} 1',
+            'yatube_request_sql_queries_bucket'
+            '{view="posts:index",le="+Inf"} 1',
+            'yatube_cache_misses_total{view="posts:index"}',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def test_metrics_are_protected(self):
+        """Гостю метрики не отдаются, по токену - отдаются."""
+        self.assertEqual(Client().get('/metrics').status_code, 403)
+        with mock.patch('core.views.METRICS_TOKEN', 'secret'):
+            response = Client().get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            wrong = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(wrong.status_code, 403)
+
+    def test_slow_request_is_logged_with_queries(self):
+        """Медленный запрос попадает в лог вместе с SQL."""
+        with mock.patch('core.middleware.METRICS_SLOW_MS', 0), \
+                self.assertLogs('yatube.slow', 'WARNING') as logs:
+            Client().get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertIn('posts:post_detail', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
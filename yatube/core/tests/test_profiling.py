@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import resolve
+
+from core import profiling
+from core.middleware import ProfilingMiddleware
+
+
+def slow_view(request):
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return HttpResponse()
+
+
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def profile(self, rate=0, threshold=0):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        with mock.patch.multiple('core.middleware', PROFILING=True,
+                                 PROFILING_RATE=rate,
+                                 PROFILING_THRESHOLD_MS=threshold,
+                                 PROFILING_INTERVAL_MS=1,
+                                 PROFILING_DIR=self.directory):
+            ProfilingMiddleware(slow_view)(request)
+        return os.listdir(self.directory)
+
+    def test_disabled_by_default(self):
+        """Без PROFILING Django не подключает middleware вовсе."""
+        with mock.patch('core.middleware.PROFILING', False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(slow_view)
+
+    def test_slow_request_is_profiled(self):
+        """Запрос дольше порога оставляет профиль со стеками view."""
+        names = self.profile(threshold=10)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith('posts-index.'))
+        stacks = profiling.read(os.path.join(self.directory, names[0]))
+        self.assertTrue(any('slow_view' in stack for stack in stacks))
+
+    def test_fast_unsampled_request_is_dropped(self):
+        """Быстрый запрос вне выборки профиля не оставляет."""
+        self.assertEqual(self.profile(threshold=10000), [])
+        self.assertEqual(len(self.profile(rate=1, threshold=10000)), 1)
+
+    def test_retention_drops_oldest(self):
+        """Старые профили удаляются, пока каталог больше лимита."""
+        for number in range(3):
+            path = os.path.join(self.directory, f'v.{number}.folded')
+            with open(path, 'w') as file:
+                file.write('a;b 1\n' * 100)
+            os.utime(path, (number, number))
+        profiling.enforce_retention(self.directory, 1500)
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['v.1.folded', 'v.2.folded'])
+
+    def test_report_merges_profiles(self):
+        """Отчёт складывает сэмплы всех профилей."""
+        for number in range(2):
+            with open(os.path.join(self.directory,
+                                   f'posts-index.{number}.folded'),
+                      'w') as file:
+                file.write('main;view;query 3\nmain;view 1\n')
+        output = os.path.join(self.directory, 'merged.txt')
+        out = StringIO()
+        call_command('profile_report', f'--dir={self.directory}',
+                     f'--output={output}', stdout=out)
+        self.assertIn('сэмплов: 8', out.getvalue())
+        self.assertIn('75.0%  query', out.getvalue())
+        with open(output) as file:
+            self.assertIn('main;view;query 6', file.read())
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core import replicas
+from core.middleware import ReplicaMiddleware
+from core.models import Job
+from posts.caching import cached_page
+from posts.models import Post
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.router.replicas = ['replica1']
+        self.addCleanup(replicas.end)
+
+    def serve(self, request, view=None):
+        """Прогоняет запрос через middleware, возвращает ответ и базу,
+        из которой view читал посты.
+        """
+        used = []
+
+        def get_response(request):
+            if view is not None:
+                view(request)
+            used.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        with mock.patch('core.middleware.DATABASE_REPLICAS', ['replica1']):
+            response = ReplicaMiddleware(get_response)(request)
+        return response, used[0]
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые потоки читают из default."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        response, db = self.serve(RequestFactory().get('/'))
+        self.assertEqual(db, 'replica1')
+        self.assertNotIn('primary', response.cookies)
+
+    def test_write_pins_request_and_reader(self):
+        """После записи запрос дочитывает из default, а кука
+        держит на default и следующие запросы читателя.
+        """
+        def view(request):
+            self.router.db_for_write(Post)
+
+        response, db = self.serve(RequestFactory().get('/'), view)
+        self.assertEqual(db, 'default')
+        self.assertIn('primary', response.cookies)
+        request = RequestFactory().get('/')
+        request.COOKIES['primary'] = '1'
+        self.assertEqual(self.serve(request)[1], 'default')
+
+    def test_write_views_read_from_primary(self):
+        """POST и пишущие view не читают с реплик."""
+        self.assertEqual(self.serve(RequestFactory().post('/'))[1],
+                         'default')
+        view = replicas.use_primary(lambda request: None)
+        response, db = self.serve(RequestFactory().get('/'), view)
+        self.assertEqual(db, 'default')
+        self.assertIn('primary', response.cookies)
+
+    def test_auth_sessions_and_jobs_read_from_primary(self):
+        """Только что вошедший читатель и свежие задачи могут ещё
+        не доехать до реплики.
+        """
+        def view(request):
+            used.extend(self.router.db_for_read(model)
+                        for model in (User, Session, ContentType, Job))
+
+        used = []
+        self.serve(RequestFactory().get('/'), view)
+        self.assertEqual(set(used), {'default'})
+
+    def test_cached_page_is_rendered_from_primary(self):
+        """Промах кэша страниц рисуется из default: страница с отстающей
+        реплики осталась бы в кэше под уже новой версией.
+        """
+        @cached_page('replicas-test')
+        def page(request):
+            used.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        def view(request):
+            request.user = AnonymousUser()
+            page(request)
+
+        used = []
+        cache.clear()
+        response, db = self.serve(RequestFactory().get('/'), view)
+        self.assertEqual(used, ['default'])
+        self.assertEqual(db, 'replica1')
+        self.assertNotIn('primary', response.cookies)
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+    def test_disabled_without_replicas(self):
+        with mock.patch('core.middleware.DATABASE_REPLICAS', []):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaMiddleware(HttpResponse)
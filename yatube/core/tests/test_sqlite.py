@@ -0,0 +1,49 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core import sqlite
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+class SqliteProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.database = DatabaseWrapper({
+            'NAME': self.path, 'ENGINE': 'core.backends.sqlite3',
+            'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+            'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False,
+            'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        }, alias='profile')
+        self.addCleanup(self.database.close)
+
+    def pragma(self, name):
+        with self.database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        self.database.ensure_connection()
+        sqlite.apply_pragmas(self.database)
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    def test_atomic_takes_write_lock_at_once(self):
+        """Второй писатель не войдёт в транзакцию, пока идёт первая,
+        хотя первая ещё ничего не записала.
+        """
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        self.database.ensure_connection()
+        self.database._start_transaction_under_autocommit()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            self.database.connection.rollback()
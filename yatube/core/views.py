@@ -1,4 +1,11 @@
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from yatube.settings import METRICS_TOKEN
+
+from .metrics import exposition
 
 
 def page_not_found(request, exception):
@@ -15,3 +22,15 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus: персоналу или по токену."""
+    token = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or bool(METRICS_TOKEN) and (
+        constant_time_compare(token, f'Bearer {METRICS_TOKEN}'))
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(exposition(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
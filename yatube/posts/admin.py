@@ -1,11 +1,21 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .forms import PostForm
+from .models import Comment, FeedEntry, Follow, Group, Post, UserStats
+
+
+class PostAdminForm(PostForm):
+    """Форма поста из PostForm, но с автором: в админке его выбирают."""
+
+    class Meta(PostForm.Meta):
+        fields = ('text', 'author', 'group', 'image')
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    form = PostAdminForm
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group',
+                    'comments_count')
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
@@ -28,3 +38,16 @@ class FollowAdmin(admin.ModelAdmin):
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'post', 'author', 'text')
     empty_value_display = '-пусто-'
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'post', 'author', 'pub_date')
+    empty_value_display = '-пусто-'
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'posts_count',
+                    'followers_count', 'following_count')
+    empty_value_display = '-пусто-'
@@ -0,0 +1,179 @@
+"""JSON-API только для чтения: ленты, группы, профили, комментарии.
+
+Те же выборки, что у HTML-страниц, но через values() - только нужные
+столбцы, без моделей. Списки листаются курсором (?cursor=...),
+ответы кэшируются теми же cached_page и conditional по версиям
+областей, так что правка поста или комментарий их сразу обновляют.
+Число комментариев есть только у отдельного поста: комментарий
+сбрасывает область поста, а не ленты.
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+
+from yatube.settings import COMMENT_NUMBER, POST_NUMBER
+
+from .caching import (ALL_POSTS, author_scope, cached_page, conditional,
+                      follow_scope, group_scope, post_scope)
+from .feed import feed_page
+from .models import Comment, Group, Post, User
+from .utils import COMMENT_ORDERING, FEED_ORDERING, CursorPaginator
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'author__username',
+               'author__first_name', 'author__last_name', 'group__slug',
+               'group__title', 'image', 'thumbnail')
+GROUP_FIELDS = ('slug', 'title', 'description')
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+def respond(data, status=200):
+    """JSON без \\u-экранирования кириллицы и лишних пробелов:
+    русский текст вдвое короче.
+    """
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':')})
+
+
+def not_found():
+    return respond({'detail': 'Не найдено.'}, status=404)
+
+
+def login_required(view):
+    """Как django login_required, но 401 в JSON вместо редиректа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return respond({'detail': 'Нужно войти.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def post_row(row):
+    name = f'{row["author__first_name"]} {row["author__last_name"]}'
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': {'username': row['author__username'],
+                   'name': name.strip()},
+        'group': row['group__slug'] and {'slug': row['group__slug'],
+                                         'title': row['group__title']},
+        'image': row['image'] and default_storage.url(row['image']),
+        'thumbnail': row['thumbnail'] or None,
+    }
+
+
+def comment_row(row):
+    return {
+        'id': row['id'],
+        'author': row['author__username'],
+        'text': row['text'],
+        'created': row['created'],
+    }
+
+
+def paginated(request, rows, serialize, per_page=POST_NUMBER,
+              ordering=FEED_ORDERING):
+    paginator = CursorPaginator(rows, per_page, ordering)
+    token = request.GET.get('cursor')
+    page = paginator.get_page(token) if token else paginator.first_page()
+    return page_response(page, serialize)
+
+
+def page_response(page, serialize):
+    return respond({
+        'results': [serialize(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@conditional(ALL_POSTS)
+@cached_page(ALL_POSTS)
+def posts(request):
+    """Все посты, новые сначала."""
+    return paginated(request, Post.objects.for_feed().values(*POST_FIELDS),
+                     post_row)
+
+
+@conditional(post_scope('{post_id}'))
+@cached_page(post_scope('{post_id}'))
+def post(request, post_id):
+    """Один пост с числом комментариев."""
+    row = Post.objects.for_feed().filter(pk=post_id).values(
+        *POST_FIELDS, 'updated', 'comments_count').first()
+    if row is None:
+        return not_found()
+    return respond({**post_row(row), 'updated': row['updated'],
+                    'comments_count': row['comments_count']})
+
+
+@conditional(post_scope('{post_id}'))
+@cached_page(post_scope('{post_id}'))
+def post_comments(request, post_id):
+    """Комментарии поста, новые сначала."""
+    return paginated(
+        request,
+        Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+        comment_row, COMMENT_NUMBER, COMMENT_ORDERING)
+
+
+@conditional(ALL_POSTS)
+@cached_page(ALL_POSTS)
+def groups(request):
+    """Сообщества по алфавиту слагов."""
+    return paginated(request, Group.objects.values(*GROUP_FIELDS), dict,
+                     ordering=('slug',))
+
+
+@conditional(group_scope('{slug}'))
+@cached_page(group_scope('{slug}'))
+def group_posts(request, slug):
+    """Посты сообщества."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return not_found()
+    return paginated(request, Post.objects.for_feed().filter(
+        group_id=group_id).values(*POST_FIELDS), post_row)
+
+
+@conditional(author_scope('{username}'))
+@cached_page(author_scope('{username}'))
+def profile(request, username):
+    """Автор и его счётчики."""
+    row = User.objects.filter(username=username).values(
+        'username', 'first_name', 'last_name', 'stats__posts_count',
+        'stats__followers_count', 'stats__following_count').first()
+    if row is None:
+        return not_found()
+    return respond({
+        'username': row['username'],
+        'name': f'{row["first_name"]} {row["last_name"]}'.strip(),
+        'posts_count': row['stats__posts_count'] or 0,
+        'followers_count': row['stats__followers_count'] or 0,
+        'following_count': row['stats__following_count'] or 0,
+    })
+
+
+@conditional(author_scope('{username}'))
+@cached_page(author_scope('{username}'))
+def profile_posts(request, username):
+    """Посты автора."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return not_found()
+    return paginated(request, Post.objects.for_feed().filter(
+        author_id=author_id).values(*POST_FIELDS), post_row)
+
+
+@login_required
+@conditional(ALL_POSTS, follow_scope('{user}'))
+@cached_page(ALL_POSTS, follow_scope('{user}'))
+def follow(request):
+    """Лента подписок вошедшего читателя."""
+    page = feed_page(request.user, request.GET.get('cursor'),
+                     Post.objects.for_feed().values(*POST_FIELDS))
+    return page_response(page, post_row)
@@ -0,0 +1,231 @@
+"""Кэш страниц с версионированными ключами.
+
+Каждая страница зависит от набора «областей» (scope): вся лента, группа,
+автор, лента подписок читателя, отдельный пост. У каждой области в кэше
+лежит номер версии, и он входит в ключ страницы. Сигналы меняют версии
+затронутых областей, поэтому страницы можно держать часами: после правки
+ключ просто становится другим, а старая копия дотлевает по таймауту.
+
+Страница в кэше одна на всех читателей: то, что у каждого своё,
+в ней оставлено дырками (см. posts.holes) и заполняется на каждый
+запрос. Поэтому ключ страницы не зависит от читателя, а лента
+подписок различается областью follow:<id>.
+
+Версия начинается со времени своей смены. Это время новой публикации,
+комментария или правки в области, из него складывается Last-Modified
+для условных GET без запроса к базе.
+"""
+import datetime
+import hashlib
+import time
+import uuid
+from functools import partial, wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import metrics, replicas
+from yatube.settings import CARD_CACHE_TIMEOUT, PAGE_CACHE_TIMEOUT
+from . import holes
+
+ALL_POSTS = 'posts'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def card_key(post_id, updated):
+    """Ключ отрисованной карточки: правка поста меняет updated и ключ."""
+    return f'card:{post_id}:{int(updated.timestamp() * 10 ** 6)}'
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def versions(scopes):
+    """Текущие версии областей; недостающие заводятся на месте."""
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    metrics.count_cache(len(found), len(missing))
+    for key in missing:
+        cache.add(key, _new_version(), None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return [str(found.get(key, '')) for key in keys]
+
+
+def _new_version():
+    """Время смены в секундах и случайный хвост: 1666000000.9f1c..."""
+    return f'{int(time.time())}.{uuid.uuid4().hex}'
+
+
+def changed_at(version):
+    """Когда версия сменилась; None для версий без времени."""
+    stamp, _, _ = str(version).partition('.')
+    if not stamp.isdigit():
+        return None
+    return datetime.datetime.fromtimestamp(int(stamp), timezone.utc)
+
+
+def after_commit(func, *args):
+    """func(*args) сразу и ещё раз после коммита текущей транзакции.
+
+    Сброс до коммита не спасает: соседний запрос ещё видит старые данные
+    и кладёт их в кэш уже под новую версию. Повтор после коммита
+    оставляет такую копию под версией, которую никто не спросит. Первый
+    вызов нужен самой транзакции: свои же чтения после записи.
+    """
+    func(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(func, *args))
+
+
+def _set_version(scopes):
+    version = _new_version()
+    cache.set_many({_version_key(scope): version for scope in scopes}, None)
+
+
+def bump(*scopes):
+    """Делает устаревшими все страницы, зависящие от этих областей."""
+    if scopes:
+        after_commit(_set_version, set(scopes))
+
+
+def viewer(request):
+    return request.user.pk if request.user.is_authenticated else 'anon'
+
+
+def page_key(name, request, scopes, extra=()):
+    raw = '|'.join([request.get_full_path(), *scopes, *versions(scopes),
+                    *map(str, extra)])
+    return f'page:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def page_state(request, state, kwargs):
+    """Результат state(request, **kwargs), один на запрос."""
+    if state is None:
+        return []
+    if not hasattr(request, '_page_state'):
+        request._page_state = list(state(request, **kwargs))
+    return request._page_state
+
+
+def cached_cards(posts, render):
+    """HTML карточек страницы: одна выборка get_many на всю страницу,
+    недостающие карточки отрисовываются и докладываются одним set_many.
+    """
+    keys = [card_key(post.pk, post.updated) for post in posts]
+    found = cache.get_many(keys)
+    fresh = {key: render(post)
+             for key, post in zip(keys, posts) if key not in found}
+    metrics.count_cache(len(found), len(fresh))
+    if fresh:
+        cache.set_many(fresh, CARD_CACHE_TIMEOUT)
+        found.update(fresh)
+    return [found[key] for key in keys]
+
+
+def _filled(request, content, content_type):
+    # Дырки бывают только в HTML: в JSON текст постов не экранирован,
+    # и метка из текста заполнилась бы как настоящая.
+    if content_type.startswith('text/html'):
+        return holes.fill(request, content)
+    return content
+
+
+def cached_page(*scopes, state=None):
+    """Кэширует ответ view по версиям областей.
+
+    Области задаются шаблонами строк, которые заполняются аргументами view
+    и id читателя: cached_page(ALL_POSTS, 'group:{slug}'). state - как
+    у conditional. В кэш идёт тело с метками дырок, общее для всех
+    читателей, а дырки заполняются на каждый запрос.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = [scope.format(user=request.user.pk, **kwargs)
+                     for scope in scopes]
+            key = page_key(view.__name__, request, names,
+                           page_state(request, state, kwargs))
+            cached = cache.get(key)
+            metrics.count_cache(cached is not None, cached is None)
+            if cached is None:
+                request.defer_holes = True
+                # Страница пойдёт в кэш под уже новыми версиями, а
+                # отстающая реплика могла ещё не увидеть ту запись,
+                # что их сменила. Поэтому промах рисуется из default.
+                with replicas.primary():
+                    response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.cookies:
+                    response.content = _filled(
+                        request, response.content.decode(response.charset),
+                        response['Content-Type'])
+                    return response
+                cached = (response.content.decode(response.charset),
+                          response['Content-Type'])
+                cache.set(key, cached, PAGE_CACHE_TIMEOUT)
+            content, content_type = cached
+            response = HttpResponse(_filled(request, content, content_type),
+                                    content_type=content_type)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional(*scopes, state=None):
+    """ETag и Last-Modified страницы по версиям её областей.
+
+    Ответ 304 уходит раньше, чем view сделает запросы и отрисует шаблон.
+    state(request, **kwargs), если задана, возвращает то, что видно
+    на странице помимо областей: даты из неё попадают в Last-Modified,
+    всё вместе - в ETag. ETag у каждого читателя свой, как и страница.
+    Дырки в кэш страницы не попадают, а в ответ - попадают: страницы
+    с кнопками подписки добавляют сюда follow:{user}, иначе после
+    подписки читатель получил бы 304 со старой кнопкой.
+    """
+    def validators(request, kwargs):
+        if not hasattr(request, '_validators'):
+            names = [scope.format(user=request.user.pk, **kwargs)
+                     for scope in scopes]
+            current = versions(names)
+            extra = page_state(request, state, kwargs)
+            stamps = [changed_at(version) for version in current] + [
+                value for value in extra
+                if isinstance(value, datetime.datetime)]
+            raw = '|'.join([request.get_full_path(), *current,
+                            *map(str, extra)])
+            request._validators = (
+                f'{viewer(request)}-{hashlib.md5(raw.encode()).hexdigest()}',
+                max(filter(None, stamps), default=None),
+            )
+        return request._validators
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: validators(
+            request, kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(
+            request, kwargs)[1],
+    )
@@ -0,0 +1,71 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики двигают сигналы через F()-выражения, поэтому прибавка попадает
+в ту же транзакцию, что и сама запись. Если счётчики разъехались,
+их чинит команда recount.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def bump_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя, заводя их при первой надобности.
+    Если строки нет, уменьшать нечего: так бывает, когда пользователя
+    удаляют каскадом вместе со счётчиками.
+    """
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    if UserStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_users(user_ids, **deltas):
+    """Прибавляет к счётчикам многих пользователей одним UPDATE."""
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def recount():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True).values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    fixed = {}
+    user_counters = {
+        'posts_count': (Post.objects.all(), 'author'),
+        'followers_count': (Follow.objects.all(), 'author'),
+        'following_count': (Follow.objects.all(), 'user'),
+    }
+    for name, (queryset, field) in user_counters.items():
+        actual = Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('user')})
+            .order_by().values(field).annotate(total=Count('pk'))
+            .values('total')[:1]
+        ), 0)
+        fixed[name] = UserStats.objects.annotate(
+            actual=actual).exclude(**{name: F('actual')}).update(
+            **{name: actual})
+    comments = Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('pk'))
+        .values('total')[:1]
+    ), 0)
+    fixed['comments_count'] = Post.objects.annotate(
+        actual=comments).exclude(comments_count=F('actual')).update(
+        comments_count=comments)
+    return fixed
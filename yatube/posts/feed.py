@@ -0,0 +1,150 @@
+"""Лента подписок, разложенная по читателям заранее (fan-out-on-write).
+
+Пост после публикации фоновой задачей раскладывается в FeedEntry
+каждому подписчику автора. Страница ленты (feed_page) - это окно
+по курсору в индексе FeedEntry (user, -pub_date, -post): без COUNT(*)
+и без OFFSET, а посты подтягиваются только для записей этого окна.
+Авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, не раскладываем:
+их посты подмешиваются при чтении (fan-out-on-read) - из индекса
+(author, -pub_date) каждого берётся такое же окно за тем же курсором.
+Когда отписки опускают автора до предела, его посты раскладываются
+всем подписчикам заново (backfill_followers).
+"""
+from django.db.models import F
+
+from yatube.settings import FEED_BACKFILL, FEED_FANOUT_LIMIT, POST_NUMBER
+
+from . import caching
+from .models import FeedEntry, Follow, Post, UserStats
+from .utils import MergedCursorPaginator
+
+# Ключ курсора ленты: у записи FeedEntry и у поста «тяжёлого» автора
+# он одинаковый, поэтому окна из обоих источников сливаются.
+FEED_KEY = ('-pub_date', '-post_id')
+
+
+def is_heavy(author_id):
+    """Слишком много подписчиков, чтобы раскладывать посты каждому."""
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=FEED_FANOUT_LIMIT).exists()
+
+
+def heavy_authors(user):
+    """Авторы из подписок читателя, чьи посты читаются на лету."""
+    return Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True)
+
+
+def _entries(user_ids, posts):
+    return [
+        FeedEntry(user_id=user_id, post_id=post_id,
+                  author_id=author_id, pub_date=pub_date)
+        for post_id, author_id, pub_date in posts
+        for user_id in user_ids
+    ]
+
+
+def fan_out(post_id):
+    """Кладёт свежий пост в ленты всех подписчиков автора. Задача
+    очереди core.jobs: пост к её запуску могли уже удалить.
+    """
+    post = Post.objects.filter(pk=post_id).values_list(
+        'id', 'author_id', 'pub_date').first()
+    if post is None or is_heavy(post[1]):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post[1]).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(_entries(followers, [post]),
+                                  ignore_conflicts=True)
+    # Ленты, закэшированные до прихода воркера, поста ещё не видели.
+    caching.bump(*map(caching.follow_scope, followers))
+
+
+def backfill(user_id, author_id):
+    """Новая подписка: последние FEED_BACKFILL постов автора - в ленту."""
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'author_id', 'pub_date')[:FEED_BACKFILL]
+    FeedEntry.objects.bulk_create(_entries([user_id], posts),
+                                  ignore_conflicts=True)
+
+
+def backfill_many(user_id, author_ids):
+    """Пачка подписок: backfill() для каждого автора, одной вставкой.
+    Задача очереди core.jobs: от кого успели отписаться - пропускаем.
+    """
+    followed = Follow.objects.filter(
+        user_id=user_id, author_id__in=author_ids).exclude(
+        author__stats__followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True)
+    posts = []
+    for author_id in followed:
+        posts += Post.objects.filter(author_id=author_id).values_list(
+            'id', 'author_id', 'pub_date')[:FEED_BACKFILL]
+    FeedEntry.objects.bulk_create(_entries([user_id], posts),
+                                  ignore_conflicts=True)
+    caching.bump(caching.follow_scope(user_id))
+
+
+def became_light(author_id):
+    """Отписка только что опустила автора до FEED_FANOUT_LIMIT: его
+    посты больше не подмешиваются при чтении, пора их разложить.
+    """
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count=FEED_FANOUT_LIMIT).exists()
+
+
+def backfill_followers(author_id):
+    """Автор перестал быть «тяжёлым»: его последние FEED_BACKFILL
+    постов - в ленты всех подписчиков. Посты, написанные, пока он был
+    «тяжёлым», и подписчики, пришедшие тогда, иначе пропали бы из лент.
+    Задача очереди core.jobs: автор мог уже снова потяжелеть.
+    """
+    if is_heavy(author_id):
+        return
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        'id', 'author_id', 'pub_date')[:FEED_BACKFILL])
+    followers = list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(_entries(followers, posts),
+                                  ignore_conflicts=True)
+    caching.bump(*map(caching.follow_scope, followers))
+
+
+def trim(user_id, author_id):
+    """Отписка: убирает посты автора из ленты читателя."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user):
+    """Собирает ленту читателя заново по его текущим подпискам."""
+    FeedEntry.objects.filter(user=user).delete()
+    for author_id in Follow.objects.filter(
+            user=user).values_list('author_id', flat=True):
+        backfill(user.pk, author_id)
+
+
+def feed_page(user, token=None, posts=None, per_page=POST_NUMBER):
+    """Страница ленты подписок по курсору token (None - первая).
+    posts - выборка, из которой берутся сами посты страницы
+    (по умолчанию Post.objects.for_feed()); годится и values().
+    """
+    sources = [FeedEntry.objects.filter(user=user).values(
+        'pub_date', 'post_id')]
+    # Окно на каждого «тяжёлого» автора: один OR по авторам база
+    # не прочтёт по индексу в нужном порядке.
+    for author_id in heavy_authors(user):
+        sources.append(Post.objects.filter(author_id=author_id).values(
+            'pub_date', post_id=F('id')))
+    paginator = MergedCursorPaginator(sources, per_page, FEED_KEY)
+    page = paginator.get_page(token) if token else paginator.first_page()
+    ids = [entry['post_id'] for entry in page]
+    if posts is None:
+        posts = Post.objects.for_feed()
+    found = {paginator.value(post, 'id'): post
+             for post in posts.filter(pk__in=ids).order_by()}
+    # Пост могли удалить между двумя запросами - его просто не будет.
+    page.object_list = [found[pk] for pk in ids if pk in found]
+    return page
@@ -0,0 +1,45 @@
+"""Подписки пачкой - для онбординга «подписаться на этих 20 авторов».
+
+Одиночную подписку обслуживают сигналы модели Follow. bulk_create
+сигналов не шлёт, поэтому follow_many сам двигает счётчики, ставит
+задачу дозаполнить ленту и сбрасывает кэш - по запросу на каждое,
+сколько бы авторов ни было.
+"""
+from core import jobs
+
+from . import caching, counters, feed
+from .models import Follow
+
+
+def following_ids(user, author_ids):
+    """Те из author_ids, на кого user подписан, - одним запросом."""
+    if not user.is_authenticated or not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user=user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def follow_many(user, authors):
+    """Подписывает user на authors, возвращает тех, на кого подписал.
+    Вызывается в транзакции: с BEGIN IMMEDIATE проверка и вставка
+    идут под одной блокировкой записи.
+    """
+    authors = {author.pk: author for author in authors
+               if author.pk != user.pk}
+    new = sorted(set(authors) - following_ids(user, authors))
+    if not new:
+        return []
+    Follow.objects.bulk_create(
+        [Follow(user=user, author_id=author_id) for author_id in new],
+        ignore_conflicts=True)
+    counters.bump_user(user.pk, following_count=len(new))
+    counters.bump_users(new, followers_count=1)
+    jobs.enqueue(feed.backfill_many, user.pk, new)
+    caching.bump(
+        caching.follow_scope(user.pk),
+        caching.author_scope(user.username),
+        *(caching.author_scope(authors[author_id].username)
+          for author_id in new),
+    )
+    return [authors[author_id] for author_id in new]
@@ -8,6 +8,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def save(self, commit=True):
+        """Запоминает размеры новой картинки, пока она ещё в памяти:
+        ImageField уже разобрал её при проверке.
+        """
+        post = super().save(commit=False)
+        if 'image' in self.changed_data:
+            image = getattr(self.cleaned_data.get('image'), 'image', None)
+            post.image_width, post.image_height = (
+                image.size if image else (None, None))
+        if commit:
+            post.save()
+            self._save_m2m()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
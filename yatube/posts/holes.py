@@ -0,0 +1,100 @@
+"""Дырки в кэшированных страницах (hole punching).
+
+Страница кэшируется одна на всех читателей, а всё, что зависит
+от читателя - шапка, переключатель лент, кнопка подписки, форма
+комментария, ссылка на правку, - оставляется в ней дырками:
+тег {% hole 'имя' ключ=значение %} пишет вместо HTML метку.
+Перед отдачей fill() находит метки и заполняет их для текущего
+запроса. Обработчик дырки получает сразу все её метки на странице
+и отвечает на них пачкой, например одним запросом к подпискам.
+"""
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+from .follows import following_ids
+from .forms import CommentForm
+
+MARKER = re.compile(r'<!--hole:(\w+):([\w=-]*)-->')
+
+_resolvers = {}
+
+
+def resolver(name):
+    """Регистрирует обработчик дырки: (request, [kwargs, ...]) -> [html]."""
+    def decorator(func):
+        _resolvers[name] = func
+        return func
+    return decorator
+
+
+def placeholder(name, kwargs):
+    raw = json.dumps(kwargs, sort_keys=True).encode()
+    return f'<!--hole:{name}:{base64.urlsafe_b64encode(raw).decode()}-->'
+
+
+def render_now(request, name, kwargs):
+    """Дырка вне кэшированной страницы - заполняем на месте."""
+    return _resolvers[name](request, [kwargs])[0]
+
+
+def fill(request, content):
+    """Заполняет все метки страницы для этого запроса."""
+    holes = {}
+    for match in MARKER.finditer(content):
+        holes.setdefault(match.group(1), {}).setdefault(
+            match.group(0), json.loads(base64.urlsafe_b64decode(
+                match.group(2))))
+    if not holes:
+        return content
+    html = {}
+    for name, markers in holes.items():
+        html.update(zip(markers, _resolvers[name](
+            request, list(markers.values()))))
+    return MARKER.sub(lambda match: html[match.group(0)], content)
+
+
+@resolver('header')
+def header(request, holes):
+    html = render_to_string('includes/header.html', request=request)
+    return [html] * len(holes)
+
+
+@resolver('switcher')
+def switcher(request, holes):
+    return [render_to_string('posts/includes/switcher.html', {
+        'index': hole['active'] == 'index',
+        'follow': hole['active'] == 'follow',
+    }, request=request) for hole in holes]
+
+
+@resolver('follow_button')
+def follow_buttons(request, holes):
+    """Кнопки подписки: одно обращение к базе на всю страницу."""
+    user = request.user
+    following = following_ids(user, {hole['author'] for hole in holes})
+    return [render_to_string('posts/includes/follow_button.html', {
+        'username': hole['username'],
+        'own': hole['author'] == user.pk,
+        'following': hole['author'] in following,
+        'small': hole.get('small', False),
+    }) for hole in holes]
+
+
+@resolver('comment_form')
+def comment_forms(request, holes):
+    if not request.user.is_authenticated:
+        return [''] * len(holes)
+    return [render_to_string('posts/includes/add_comment.html', {
+        'post': {'id': hole['post']},
+        'form': CommentForm(),
+    }, request=request) for hole in holes]
+
+
+@resolver('edit_link')
+def edit_links(request, holes):
+    return [render_to_string('posts/includes/edit_link.html', {
+        'post_id': hole['post'],
+    }) if hole['author'] == request.user.pk else '' for hole in holes]
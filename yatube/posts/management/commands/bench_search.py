@@ -0,0 +1,90 @@
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import match_expression
+
+BATCH_SIZE = 10000
+WORDS_PER_POST = 30
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексу FTS5 со сканированием '
+            'LIKE (так работает icontains) на временной базе SQLite.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Сколько постов сгенерировать.')
+        parser.add_argument('--vocabulary', type=int, default=50000,
+                            help='Сколько разных слов в текстах.')
+        parser.add_argument('--queries', type=int, default=20,
+                            help='Сколько запросов прогнать каждым способом.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def fill(self, db, rows, vocabulary, rng):
+        words = [f'слово{number}' for number in range(vocabulary)]
+        # Частоты слов по Ципфу, как в живых текстах.
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, vocabulary + 1)))
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+        db.execute("CREATE VIRTUAL TABLE post_search USING fts5("
+                   "text, tokenize = 'unicode61 remove_diacritics 2')")
+        for start in range(0, rows, BATCH_SIZE):
+            batch = [
+                (post_id, ' '.join(rng.choices(words, cum_weights=weights,
+                                               k=WORDS_PER_POST)))
+                for post_id in range(start + 1,
+                                     min(start + BATCH_SIZE, rows) + 1)
+            ]
+            db.executemany('INSERT INTO post VALUES (?, ?)', batch)
+            db.executemany(
+                'INSERT INTO post_search (rowid, text) VALUES (?, ?)', batch)
+            self.stdout.write(f'\rПостов: {start + len(batch)}', ending='')
+        db.commit()
+        self.stdout.write('')
+        return words
+
+    def measure(self, db, sql, params_list):
+        timings = []
+        for params in params_list:
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), max(timings)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(os.path.join(directory, 'bench.sqlite3'))
+            started = time.perf_counter()
+            words = self.fill(db, options['rows'], options['vocabulary'], rng)
+            self.stdout.write(
+                f'Заполнено за {time.perf_counter() - started:.1f} с')
+            queries = rng.sample(words, options['queries'])
+            scan = self.measure(
+                db,
+                "SELECT id, text FROM post WHERE text LIKE ? ESCAPE '\\' "
+                'ORDER BY id DESC LIMIT 10',
+                [(f'%{query}%',) for query in queries],
+            )
+            indexed = self.measure(
+                db,
+                'SELECT rowid, highlight(post_search, 0, "[", "]") '
+                'FROM post_search WHERE post_search MATCH ? '
+                'ORDER BY bm25(post_search), rowid LIMIT 11',
+                [(match_expression(query),) for query in queries],
+            )
+            db.close()
+        for name, (median, worst) in (('icontains', scan),
+                                      ('FTS5', indexed)):
+            self.stdout.write(
+                f'{name:>10}: медиана {median:8.2f} мс, '
+                f'худший {worst:8.2f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'FTS5 быстрее в {scan[0] / max(indexed[0], 1e-6):.0f} раз'))
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import sqlite
+from posts.management.commands.bench_views import percentile
+from posts.models import Post, User
+
+# Профиль: движок, PRAGMA и CONN_MAX_AGE. До production - журнал
+# отката, отложенный BEGIN и новое соединение на каждый запрос.
+PROFILES = {
+    'development': ('django.db.backends.sqlite3',
+                    (('journal_mode', 'DELETE'),), 0),
+    'production': ('core.backends.sqlite3', sqlite.PRAGMAS, 600),
+}
+DUMMY_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def reader(client, post_ids, rng):
+    return client.get(reverse('posts:index'), {'page': rng.randint(1, 5)})
+
+
+def writer(client, post_ids, rng):
+    return client.post(
+        reverse('posts:add_comment', args=(rng.choice(post_ids),)),
+        {'text': f'нагрузка {rng.random()}'})
+
+
+def worker(role, user_id, post_ids, profile, options, seed, results):
+    """Тело дочернего процесса: долбит свою страницу до дедлайна."""
+    path, engine, pragmas, conn_max_age = profile
+    # Соединений от родителя нет: подменяем настройки, и следующее
+    # соединение откроется уже к копии и с движком профиля.
+    connections.databases['default'].update(
+        NAME=path, ENGINE=engine, CONN_MAX_AGE=conn_max_age)
+    del connections['default']
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    if not options['cache']:
+        override_settings(CACHES=DUMMY_CACHE).enable()
+    connection_created.connect(
+        lambda connection, **kwargs: sqlite.apply_pragmas(
+            connection, pragmas), weak=False)
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+    client.force_login(User.objects.get(pk=user_id))
+    action = writer if role == 'writer' else reader
+    timings, errors = [], 0
+    deadline = time.perf_counter() + options['seconds']
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            ok = action(client, post_ids, rng).status_code < 400
+        except OperationalError:
+            # «database is locked»: писатель не дождался очереди.
+            ok = False
+        if ok:
+            timings.append((time.perf_counter() - started) * 1000)
+        else:
+            errors += 1
+    connections.close_all()
+    results.put((role, timings, errors))
+
+
+class Command(BaseCommand):
+    help = ('Параллельно гоняет процессы-читатели главной и процессы-'
+            'писатели комментариев на копии базы - без PRAGMA профиля '
+            'production и с ними - и сравнивает пропускную способность.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--cache', action='store_true',
+                            help='Не отключать кэш страниц: по умолчанию '
+                                 'читатели ходят в базу на каждый запрос.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        database = connections['default']
+        if database.vendor != 'sqlite':
+            raise CommandError('Замер только для SQLite.')
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:100])
+        if not post_ids or not user_ids:
+            raise CommandError('Нужны посты и пользователи: '
+                               'сначала manage.py seed_load.')
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write(f'{"профиль":<14}{"чтения/с":>10}'
+                              f'{"p95 чт.":>9}{"записи/с":>10}'
+                              f'{"p95 зап.":>9}{"ошибки":>8}')
+            for name, (engine, pragmas, max_age) in PROFILES.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.copy(database, path, pragmas)
+                self.report(name, self.run(
+                    (path, engine, pragmas, max_age), post_ids, user_ids,
+                    options), options['seconds'])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def copy(self, database, path, pragmas):
+        database.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            database.connection.backup(target)
+            for name, value in pragmas:
+                target.execute(f'PRAGMA {name} = {value}')
+        finally:
+            target.close()
+
+    def run(self, profile, post_ids, user_ids, options):
+        # Дочерние процессы - копии этого: соединения закрываем заранее,
+        # чтобы ни одно не досталось им по наследству.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        roles = (['reader'] * options['readers']
+                 + ['writer'] * options['writers'])
+        rng = random.Random(options['seed'])
+        processes = [context.Process(target=worker, args=(
+            role, rng.choice(user_ids), post_ids, profile, options,
+            rng.random(), results)) for role in roles]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return collected
+
+    def report(self, name, collected, seconds):
+        line = f'{name:<14}'
+        for role in ('reader', 'writer'):
+            timings = sorted(timing for kind, role_timings, _ in collected
+                             if kind == role for timing in role_timings)
+            p95 = percentile(timings, 0.95) or 0
+            line += f'{len(timings) / seconds:>10.1f}{p95:>9.1f}'
+        errors = sum(errors for _, _, errors in collected)
+        self.stdout.write(f'{line}{errors:>8}')
@@ -0,0 +1,159 @@
+import json
+import math
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+SAMPLE_SIZE = 100
+READERS = 20
+
+
+def percentile(sorted_values, share):
+    """Процентиль по ближайшему рангу."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(share * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = ('Гоняет ленты, профиль и страницу поста через тестовый клиент '
+            'и сохраняет в JSON задержки p50/p95/p99, запросы к базе '
+            'и пропускную способность.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Сколько запросов к каждой странице.')
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Сколько запросов сделать до замеров.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Чистить кэш перед каждым запросом.')
+        parser.add_argument('--output', default='bench_views.json',
+                            help='Куда сохранить результаты.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        # Не с 127.0.0.1, иначе django-debug-toolbar встроится в ответы.
+        self.guest = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+        results = {}
+        for name, make_request in self.scenarios().items():
+            results[name] = self.run(make_request, options)
+        report = {
+            'started': timezone.now().isoformat(),
+            'options': {key: options[key] for key in (
+                'requests', 'warmup', 'cold', 'seed')},
+            'cache': settings.CACHES['default']['BACKEND'],
+            'data': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'views': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['views']
+        self.print_table(results, previous)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'))
+
+    def sample(self, queryset, field):
+        return list(queryset.order_by('?').values_list(
+            field, flat=True)[:SAMPLE_SIZE])
+
+    def reader_clients(self):
+        clients = []
+        for user in User.objects.filter(
+                stats__following_count__gt=0).order_by('?')[:READERS]:
+            client = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+            client.force_login(user)
+            clients.append(client)
+        return clients
+
+    def scenarios(self):
+        """Страница -> функция, которая делает к ней очередной запрос."""
+        slugs = self.sample(Group.objects.all(), 'slug')
+        usernames = self.sample(
+            User.objects.filter(stats__posts_count__gt=0), 'username')
+        post_ids = self.sample(Post.objects.all(), 'pk')
+        readers = self.reader_clients()
+        choice = self.rng.choice
+        scenarios = {
+            'index': lambda: self.guest.get(
+                reverse('posts:index'),
+                {'page': choice((1, 1, 1, 2, 3))}),
+        }
+        if slugs:
+            scenarios['group_posts'] = lambda: self.guest.get(
+                reverse('posts:group_list', args=(choice(slugs),)))
+        if usernames:
+            scenarios['profile'] = lambda: self.guest.get(
+                reverse('posts:profile', args=(choice(usernames),)))
+        if post_ids:
+            scenarios['post_detail'] = lambda: self.guest.get(
+                reverse('posts:post_detail', args=(choice(post_ids),)))
+        if readers:
+            scenarios['follow_index'] = lambda: choice(readers).get(
+                reverse('posts:follow_index'))
+        return scenarios
+
+    def run(self, make_request, options):
+        for _ in range(options['warmup']):
+            make_request()
+        timings, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = make_request()
+                timings.append(
+                    (time.perf_counter() - request_started) * 1000)
+            queries.append(len(captured))
+            errors += response.status_code != 200
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'p50_ms': percentile(timings, 0.50),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'mean_ms': statistics.mean(timings) if timings else None,
+            'queries_mean': statistics.mean(queries) if queries else None,
+            'queries_max': max(queries, default=None),
+            'throughput_rps': len(timings) / elapsed if elapsed else None,
+        }
+
+    def print_table(self, results, previous):
+        self.stdout.write(f'{"страница":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+                          f'{"запросы":>9}{"rps":>9}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<14}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries_mean"]:>9.1f}'
+                f'{result["throughput_rps"]:>9.0f}')
+            before = (previous or {}).get(name)
+            if before and before.get('p95_ms'):
+                change = result['p95_ms'] / before['p95_ms'] - 1
+                self.stdout.write(f'{"":<14}p95 {change:+.0%} к прошлому')
@@ -0,0 +1,73 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from yatube.settings import POST_NUMBER
+
+# Полный проход по таблице: «SCAN posts_post» без индекса у SQLite
+# и «Seq Scan» у PostgreSQL.
+FULL_SCAN = re.compile(
+    r'\bSCAN (TABLE )?(?P<table>\w+)(?!.*INDEX)'
+    r'|Seq Scan on (?P<pg>\w+)'
+)
+# Сортировка мимо индекса: SQLite строит временное B-дерево (в том числе
+# для «правой части» ORDER BY), PostgreSQL - узел Sort.
+SORT = re.compile(r'USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY'
+                  r'|^\W*Sort\b')
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет EXPLAIN по запросам лент и сообщает '
+            'о полных проходах по таблицам и сортировках мимо индекса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если найдена проблема.')
+
+    def feed_queries(self):
+        """Формы запросов, которые выполняют страницы постов."""
+        group = Group.objects.first() or Group(pk=0)
+        user = User.objects.first() or User(pk=0)
+        post = Post.objects.first() or Post(pk=0)
+        return {
+            'index': Post.objects.for_feed(),
+            'group_posts': group.posts.for_feed(),
+            'profile': Post.objects.for_feed().filter(author=user),
+            'follow_index': FeedEntry.objects.filter(user=user).values(
+                'pub_date', 'post_id'),
+            'follow_heavy': Post.objects.filter(author=user).values(
+                'pub_date', post_id=F('id')),
+            'following': Follow.objects.filter(user=user, author=user),
+            'post_detail': Post.objects.for_detail().filter(pk=post.pk),
+            'comments': Comment.objects.filter(post=post),
+        }
+
+    def problems(self, plan):
+        """Что в плане не так: полные проходы и сортировки."""
+        for line in plan.splitlines():
+            match = FULL_SCAN.search(line)
+            if match:
+                yield (f'полный проход по '
+                       f'{match.group("table") or match.group("pg")}')
+            elif SORT.search(line):
+                yield 'сортировка мимо индекса'
+
+    def handle(self, *args, **options):
+        scans = 0
+        for name, queryset in self.feed_queries().items():
+            plan = queryset[:POST_NUMBER].explain()
+            found = list(self.problems(plan))
+            if found:
+                scans += 1
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: {", ".join(found)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+            if options['verbosity'] > 1 or found:
+                self.stdout.write(plan)
+        if scans and options['strict']:
+            raise CommandError(f'Запросов с полным проходом '
+                               f'или сортировкой: {scans}')
@@ -0,0 +1,73 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+STATE_FILE = '.export_state.json'
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в каталог '
+            '(JSONL или CSV). Прерванную выгрузку продолжает.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для выгрузки.')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Сколько строк читать из базы за раз.')
+        parser.add_argument('--media', action='store_true',
+                            help='Скопировать картинки постов в выгрузку.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать заново, забыв прерванную выгрузку.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        state_path = os.path.join(directory, STATE_FILE)
+        state = {} if options['restart'] else transfer.load_state(state_path)
+        if state.get('format', options['format']) != options['format']:
+            raise CommandError(
+                f'Прерванная выгрузка была в {state["format"]}, '
+                f'продолжите её или запустите с --restart')
+        state['format'] = options['format']
+        for kind in transfer.KINDS:
+            self.export(kind, directory, state, state_path, options)
+        os.remove(state_path)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено в {directory}'))
+
+    def export(self, kind, directory, state, state_path, options):
+        last_pk = state.get(kind.name)
+        rows = kind.queryset()
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        total = rows.count()
+        chunk_size = options['chunk_size']
+        writer = transfer.Writer(kind.path(directory, options['format']),
+                                 options['format'], kind.columns,
+                                 append=last_pk is not None)
+        image = (kind.columns.index('image')
+                 if options['media'] and 'image' in kind.columns else None)
+        done = 0
+        try:
+            for values in rows.iterator(chunk_size=chunk_size):
+                writer.write(values)
+                if image is not None:
+                    transfer.copy_to_dump(values[image], directory)
+                done += 1
+                if done % chunk_size == 0 or done == total:
+                    # Сначала строки на диск, потом отметка о них:
+                    # после сбоя строки могут повториться, но не пропасть.
+                    writer.flush()
+                    state[kind.name] = values[0]
+                    transfer.save_state(state_path, state)
+                    self.progress(f'{kind.name}: {done} из {total}')
+        finally:
+            writer.close()
+        self.stdout.write(f'\r{kind.name}: {done} из {total}')
+
+    def progress(self, line):
+        """Строка прогресса, которая перезаписывает себя в терминале."""
+        if self.stdout.isatty():
+            self.stdout.write(f'\r{line}', ending='')
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import dimensions
+from yatube.settings import THUMBNAIL_WORKERS
+
+BATCH_SIZE = 500
+
+
+def read(post):
+    """Размеры картинки поста или (None, None), если файл не читается."""
+    try:
+        return post, dimensions(post.image)
+    except (OSError, ValueError):
+        return post, (None, None)
+
+
+class Command(BaseCommand):
+    help = ('Запоминает ширину и высоту картинок уже загруженных постов, '
+            'чтобы шаблоны не открывали файлы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=THUMBNAIL_WORKERS,
+            help='Сколько потоков читают заголовки файлов; 0 - всё в этом.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перечитать и те, у которых размеры уже известны.')
+
+    def read(self, posts, workers):
+        if not workers:
+            yield from map(read, posts)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(read, posts)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only(
+            'image', 'image_width', 'image_height')
+        if not options['force']:
+            posts = posts.filter(image_height__isnull=True)
+        # Потоки только читают файлы, в базу пишет этот поток пачками.
+        batch, done, missing = [], 0, 0
+        for post, (width, height) in self.read(posts.iterator(),
+                                               options['workers']):
+            if width is None:
+                missing += 1
+                continue
+            post.image_width, post.image_height = width, height
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                done += self.save(batch)
+        done += self.save(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Размеры записаны: {done}, файлов не найдено: {missing}'))
+
+    def save(self, batch):
+        Post.objects.bulk_update(batch, ('image_width', 'image_height'))
+        saved = len(batch)
+        batch.clear()
+        return saved
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from yatube.settings import THUMBNAIL_WORKERS
+
+
+class Command(BaseCommand):
+    help = 'Заранее строит миниатюры для картинок постов из MEDIA_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=THUMBNAIL_WORKERS,
+            help='Сколько потоков строят миниатюры; 0 - всё в этом потоке.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить и те, у которых миниатюра уже есть.')
+
+    def generate(self, ids, workers):
+        if not workers:
+            yield from map(thumbnails.generate, ids)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(thumbnails.generate_in_thread, ids)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(thumbnail='')
+        ids = list(posts.values_list('pk', flat=True))
+        done = 0
+        for url in self.generate(ids, options['workers']):
+            done += url is not None
+            if options['verbosity'] > 1:
+                self.stdout.write(url or 'пропущено')
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр построено: {done} из {len(ids)}'))
@@ -0,0 +1,89 @@
+import itertools
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts import transfer
+
+STATE_FILE = '.import_state.json'
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts пачками через bulk_create. '
+            'Уже загруженные строки пропускает, прерванную загрузку '
+            'продолжает.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с выгрузкой.')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько строк вставлять одной транзакцией.')
+        parser.add_argument('--media', action='store_true',
+                            help='Скопировать картинки из выгрузки '
+                                 'в MEDIA_ROOT.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Читать файлы с начала, забыв прогресс.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'Нет каталога {directory}')
+        state_path = os.path.join(directory, STATE_FILE)
+        state = {} if options['restart'] else transfer.load_state(state_path)
+        with transfer.original_dates():
+            for kind in transfer.KINDS:
+                path = kind.path(directory, options['format'])
+                if os.path.exists(path):
+                    self.load(kind, path, state, state_path, options)
+        self.reset_sequences()
+        # bulk_create не шлёт сигналов: пересобираем всё, что они ведут.
+        call_command('recount', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        cache.clear()
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        self.stdout.write(self.style.SUCCESS(f'Загружено из {directory}'))
+
+    def load(self, kind, path, state, state_path, options):
+        done = state.get(kind.name, 0)
+        rows = itertools.islice(
+            transfer.read_rows(path, options['format']), done, None)
+        while True:
+            batch = list(itertools.islice(rows, options['batch_size']))
+            if not batch:
+                break
+            with transaction.atomic():
+                user_ids = transfer.user_ids(
+                    row[column] for row in batch for column in kind.users)
+                kind.model.objects.bulk_create(
+                    [kind.to_python(row, user_ids) for row in batch],
+                    ignore_conflicts=True,
+                )
+            if options['media'] and 'image' in kind.columns:
+                for row in batch:
+                    transfer.copy_from_dump(row.get('image'),
+                                            options['directory'])
+            done += len(batch)
+            state[kind.name] = done
+            transfer.save_state(state_path, state)
+            self.progress(f'{kind.name}: {done}')
+        self.stdout.write(f'\r{kind.name}: {done}')
+
+    def reset_sequences(self):
+        """id пришли из выгрузки - сдвигаем счётчики автоинкремента."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [kind.model for kind in transfer.KINDS])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def progress(self, line):
+        """Строка прогресса, которая перезаписывает себя в терминале."""
+        if self.stdout.isatty():
+            self.stdout.write(f'\r{line}', ending='')
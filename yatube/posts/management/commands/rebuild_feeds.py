@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feed
+from posts.models import FeedEntry, Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок (FeedEntry) по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Чьи ленты пересобрать; по умолчанию - всех читателей.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(
+                users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(
+                    f'Нет таких пользователей: {", ".join(sorted(missing))}')
+        else:
+            FeedEntry.objects.exclude(
+                user_id__in=Follow.objects.values('user_id')).delete()
+        total = 0
+        for user in users.iterator():
+            feed.rebuild(user)
+            total += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Лента {user.username} пересобрана')
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {total}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            self.stdout.write(self.style.WARNING(
+                'Индекс есть только в SQLite, поиск сканирует таблицу.'))
+            return
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'В индексе постов: {total}'))
@@ -0,0 +1,144 @@
+import datetime
+import itertools
+import random
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post, User
+
+SYLLABLES = ('ка', 'ло', 'ми', 'на', 'ра', 'то', 'ве', 'су', 'ды', 'ше',
+             'пре', 'ство', 'ни', 'ла', 'ко', 'ре', 'бы', 'по', 'жи', 'зо')
+
+
+def skewed_weights(rng, count, alpha):
+    """Накопленные веса по Парето: немногие получают почти всё,
+    как самые читаемые авторы и самые обсуждаемые посты.
+    """
+    return list(itertools.accumulate(
+        rng.paretovariate(alpha) for _ in range(count)))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками с перекошенным, '
+            'как в жизни, распределением - для нагрузочных замеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать публикации.')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель Парето: меньше - круче перекос.')
+        parser.add_argument('--prefix', default='load',
+                            help='Начало имён пользователей и слагов групп.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.now = timezone.now()
+        prefix = options['prefix']
+        self.insert(User, (
+            self.user(f'{prefix}_user{number}')
+            for number in range(options['users'])))
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_user').values_list(
+            'pk', flat=True))
+        self.insert(Group, (
+            Group(title=f'Группа {number}', slug=f'{prefix}-{number}',
+                  description=self.text(5, 30))
+            for number in range(options['groups'])))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-').values_list('pk', flat=True))
+        with transfer.original_dates():
+            self.insert(Post, self.posts(user_ids, group_ids))
+            post_ids = list(Post.objects.filter(
+                author_id__in=user_ids).values_list('pk', flat=True))
+            self.insert(Comment, self.comments(user_ids, post_ids))
+        self.insert(Follow, self.follows(user_ids))
+        call_command('recount', stdout=self.stdout)
+        call_command('rebuild_feeds', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Нагрузочные данные готовы'))
+
+    def insert(self, model, objects):
+        total = 0
+        for batch in batches(objects, self.options['batch_size']):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def user(self, username):
+        user = User(username=username, first_name=username.title())
+        user.set_unusable_password()
+        return user
+
+    def text(self, low, high):
+        """Абракадабра из слогов, длина - от low до high слов."""
+        return ' '.join(
+            ''.join(self.rng.choices(SYLLABLES, k=self.rng.randint(1, 4)))
+            for _ in range(self.rng.randint(low, high)))
+
+    def moment(self):
+        """Момент публикации: свежих записей больше, чем старых."""
+        age = min(self.rng.expovariate(3 / self.options['days']),
+                  self.options['days'])
+        return self.now - datetime.timedelta(days=age)
+
+    def posts(self, user_ids, group_ids):
+        activity = skewed_weights(self.rng, len(user_ids),
+                                  self.options['alpha'])
+        topics = skewed_weights(self.rng, len(group_ids),
+                                self.options['alpha'])
+        authors = self.rng.choices(user_ids, cum_weights=activity,
+                                   k=self.options['posts'])
+        for author_id in authors:
+            pub_date = self.moment()
+            group_id = None
+            if group_ids and self.rng.random() < 0.7:
+                group_id = self.rng.choices(group_ids, cum_weights=topics)[0]
+            yield Post(text=self.text(10, 120), author_id=author_id,
+                       group_id=group_id, pub_date=pub_date,
+                       updated=pub_date)
+
+    def comments(self, user_ids, post_ids):
+        if not post_ids:
+            return
+        interest = skewed_weights(self.rng, len(post_ids),
+                                  self.options['alpha'])
+        for post_id in self.rng.choices(post_ids, cum_weights=interest,
+                                        k=self.options['comments']):
+            yield Comment(post_id=post_id, author_id=self.rng.choice(user_ids),
+                          text=self.text(2, 25), created=self.moment())
+
+    def follows(self, user_ids):
+        popularity = skewed_weights(self.rng, len(user_ids),
+                                    self.options['alpha'])
+        authors = self.rng.choices(user_ids, cum_weights=popularity,
+                                   k=self.options['follows'])
+        for author_id in authors:
+            user_id = self.rng.choice(user_ids)
+            # Повторы отсеет уникальный индекс, себя пропускаем сами.
+            if user_id != author_id:
+                yield Follow(user_id=user_id, author_id=author_id)
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:06
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    """Перед уникальным ограничением оставляет по одной подписке."""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(pk=row['first']).delete()
+        stats = UserStats.objects.filter(user_id=row['user']).first()
+        if stats:
+            stats.following_count -= row['total'] - 1
+            stats.save()
+        stats = UserStats.objects.filter(user_id=row['author']).first()
+        if stats:
+            stats.followers_count -= row['total'] - 1
+            stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
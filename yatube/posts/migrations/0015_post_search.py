@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    """Таблица FTS5 с текстами постов; есть только в SQLite."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')")
+    schema_editor.execute(
+        'INSERT INTO posts_post_search (rowid, text) '
+        'SELECT id, text FROM posts_post')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ('-created', '-id'), 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_ordering_tiebreak'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='feedentry',
+            options={'ordering': ('-pub_date', '-post_id'), 'verbose_name': 'Запись ленты', 'verbose_name_plural': 'Записи лент'},
+        ),
+        migrations.RemoveIndex(
+            model_name='feedentry',
+            name='feed_user_pub_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_post_idx'),
+        ),
+    ]
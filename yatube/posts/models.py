@@ -13,6 +13,27 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа приходят тем же запросом."""
+        return self.select_related('author', 'group')
+
+    def for_detail(self):
+        """Пост для отдельной страницы: ещё и счётчики автора."""
+        return self.select_related('author__stats', 'group')
+
+    def with_follow_state(self, user):
+        """author_followed - подписан ли user на автора поста: один
+        подзапрос Exists() на всю выборку, а не запрос на карточку.
+        """
+        if not user.is_authenticated:
+            return self.annotate(author_followed=models.Value(
+                False, output_field=models.BooleanField()))
+        return self.annotate(author_followed=models.Exists(
+            Follow.objects.filter(user=user, author=models.OuterRef(
+                'author'))))
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -22,6 +43,7 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -42,11 +64,42 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.text[0:15]
@@ -74,9 +127,13 @@ class Comment(models.Model):
     )
 
     class Meta:
-        ordering = ('-created',)
+        ordering = ('-created', '-id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.text[0:15]
@@ -96,5 +153,77 @@ class Follow(models.Model):
         verbose_name='Автор',
     )
 
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+        ]
+
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, чтобы не делать COUNT(*) на каждой странице."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок: пост, разложенный читателю при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        # post_id, а не post: по post Django отсортировал бы
+        # по ordering поста, с JOIN на posts_post.
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='feed_user_pub_date_post_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user_id}'
@@ -0,0 +1,143 @@
+"""Полнотекстовый поиск по постам.
+
+Текст постов копируется в виртуальную таблицу FTS5 posts_post_search
+(rowid - id поста): сигналы переписывают строку при сохранении
+и стирают при удалении. Найденное сортируется по bm25 и листается
+курсором по паре (оценка, id), без OFFSET. На базах, отличных
+от SQLite, поиск откатывается к сканированию icontains.
+"""
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from yatube.settings import POST_NUMBER
+
+from .models import Post
+from .utils import (NEXT, CursorPage, CursorPaginator, decode_cursor,
+                    encode_cursor)
+
+TABLE = 'posts_post_search'
+# Границы подсветки от highlight(): управляющие символы,
+# которых нет в тексте постов и которые не трогает escape().
+MARK_START, MARK_END = '\x02', '\x03'
+WORD = re.compile(r'\w+')
+MAX_WORDS = 10
+
+
+def enabled():
+    return connection.vendor == 'sqlite'
+
+
+def index(post_id, text):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+                       [post_id, text])
+
+
+def unindex(post_id):
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Заново переносит в индекс все посты, возвращает их число."""
+    if not enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}')
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_expression(query):
+    """Запрос пользователя -> выражение MATCH: все слова сразу,
+    последнее - как префикс, пока его ещё допечатывают.
+    """
+    words = WORD.findall(query.lower())[:MAX_WORDS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def highlight(marked):
+    """Экранирует текст и превращает маркеры FTS5 в <mark>."""
+    return mark_safe(escape(marked).replace(MARK_START, '<mark>')
+                     .replace(MARK_END, '</mark>'))
+
+
+def _after(token):
+    """Оценка и id последнего поста прошлой страницы, если токен цел."""
+    try:
+        _, values = decode_cursor(token)
+        rank, post_id = values
+        return float(rank), int(post_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ranked(expression, after, per_page):
+    sql = (f'SELECT rowid, bm25({TABLE}) AS score, '
+           f'highlight({TABLE}, 0, %s, %s) '
+           f'FROM {TABLE} WHERE {TABLE} MATCH %s')
+    params = [MARK_START, MARK_END, expression]
+    if after:
+        sql += (f' AND (bm25({TABLE}) > %s '
+                f'OR (bm25({TABLE}) = %s AND rowid > %s))')
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY score, rowid LIMIT %s'
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _posts(user):
+    return Post.objects.for_feed().with_follow_state(user)
+
+
+def _scan(query, token, per_page, user):
+    posts = _posts(user).filter(text__icontains=query)
+    paginator = CursorPaginator(posts, per_page)
+    page_obj = paginator.get_page(token) if token else paginator.first_page()
+    for post in page_obj:
+        post.highlight = escape(post.text)
+    return page_obj
+
+
+def find_posts(query, token=None, per_page=POST_NUMBER, user=None):
+    """Страница найденных постов, самые подходящие сначала, с подпиской
+    читателя user на их авторов (author_followed).
+    """
+    user = user or AnonymousUser()
+    expression = match_expression(query)
+    if expression is None:
+        return CursorPage([])
+    if not enabled():
+        return _scan(query, token, per_page, user)
+    rows = _ranked(expression, token and _after(token), per_page)
+    found = rows[:per_page]
+    posts = _posts(user).in_bulk([row[0] for row in found])
+    page = []
+    for post_id, _, marked in found:
+        # Пост могли удалить между двумя запросами.
+        if post_id in posts:
+            post = posts[post_id]
+            post.highlight = highlight(marked)
+            page.append(post)
+    next_cursor = None
+    if len(rows) > per_page:
+        post_id, score, _ = found[-1]
+        next_cursor = encode_cursor(NEXT, [score, post_id])
+    return CursorPage(page, next_cursor=next_cursor)
@@ -0,0 +1,180 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs
+
+from . import caching, counters, feed, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    """У каждого пользователя сразу есть строка счётчиков."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    """Новый пост: счётчик автора и задача разложить его по лентам."""
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        jobs.enqueue(feed.fan_out, instance.pk,
+                     key=f'fan_out:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Подписка: счётчики обеих сторон и посты автора в ленту."""
+    if created:
+        counters.bump_user(instance.user_id, following_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Отписка: счётчики обеих сторон и посты автора из ленты."""
+    counters.bump_user(instance.user_id, following_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    feed.trim(instance.user_id, instance.author_id)
+    if feed.became_light(instance.author_id):
+        jobs.enqueue(feed.backfill_followers, instance.author_id,
+                     key=f'backfill_followers:{instance.author_id}')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    """Запоминает группу, карточку и текст поста до правки: пост может
+    уйти из группы, старая карточка в кэше больше не понадобится,
+    а неизменный текст незачем переиндексировать.
+    """
+    instance._previous_group_id = instance._previous_card = None
+    instance._previous_text = None
+    if instance.pk:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'updated', 'text').first()
+        if previous:
+            instance._previous_group_id = previous[0]
+            instance._previous_card = caching.card_key(
+                instance.pk, previous[1])
+            instance._previous_text = previous[2]
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    if instance.text != getattr(instance, '_previous_text', None):
+        search.index(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    caching.after_commit(cache.delete_many, list(
+        {getattr(instance, '_previous_card', None),
+         caching.card_key(instance.pk, instance.updated)} - {None}))
+    group_ids = {instance.group_id,
+                 getattr(instance, '_previous_group_id', None)} - {None}
+    caching.bump(
+        caching.ALL_POSTS,
+        caching.post_scope(instance.pk),
+        caching.author_scope(instance.author.username),
+        *(caching.group_scope(slug) for slug in Group.objects.filter(
+            pk__in=group_ids).values_list('slug', flat=True)),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    caching.bump(caching.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    """Заголовок и ссылка группы видны и в общей ленте."""
+    caching.bump(caching.ALL_POSTS, caching.group_scope(instance.slug))
+
+
+# Что из группы и автора видно на карточке поста.
+CARD_FIELDS = {
+    Group: ('slug', 'title'),
+    User: ('username', 'first_name', 'last_name'),
+}
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_card_fields(sender, instance, update_fields=None, **kwargs):
+    """Запоминает то, что группа или автор показывают на карточках.
+    Вход пишет только last_login - тогда смотреть нечего.
+    """
+    fields = CARD_FIELDS[sender]
+    instance._previous_card_fields = None
+    if instance.pk and (update_fields is None
+                        or set(fields) & set(update_fields)):
+        instance._previous_card_fields = sender.objects.filter(
+            pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def invalidate_cards(sender, instance, created, **kwargs):
+    """Новый адрес или имя группы, новое имя автора: карточки его постов
+    в кэше ключены только постом и его updated, их надо выбросить,
+    как и страницы, в которые они уже вклеены.
+    """
+    previous = getattr(instance, '_previous_card_fields', None)
+    current = tuple(getattr(instance, name) for name in CARD_FIELDS[sender])
+    if created or previous is None or previous == current:
+        return
+    field = 'group' if sender is Group else 'author'
+    posts = list(Post.objects.filter(**{field: instance}).values_list(
+        'pk', 'updated', 'group__slug'))
+    caching.after_commit(cache.delete_many, [
+        caching.card_key(pk, updated) for pk, updated, _ in posts])
+    scopes = {caching.ALL_POSTS, *(caching.post_scope(pk)
+                                   for pk, _, _ in posts)}
+    if sender is Group:
+        scopes.add(caching.group_scope(previous[0]))
+    else:
+        scopes |= {caching.author_scope(previous[0]),
+                   caching.author_scope(instance.username),
+                   *(caching.group_scope(slug)
+                     for _, _, slug in posts if slug)}
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    """Лента читателя, кнопка подписки и счётчики в профилях обоих."""
+    caching.bump(
+        caching.follow_scope(instance.user_id),
+        *(caching.author_scope(username) for username in User.objects.filter(
+            pk__in=(instance.user_id, instance.author_id)
+        ).values_list('username', flat=True)),
+    )
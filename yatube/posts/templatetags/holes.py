@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Часть страницы, своя у каждого читателя.
+
+    В кэшируемой странице остаётся меткой, которую заполнит cached_page,
+    в остальных отрисовывается сразу.
+    """
+    request = context.get('request')
+    if request is None or getattr(request, 'defer_holes', False):
+        return mark_safe(holes.placeholder(name, kwargs))
+    return mark_safe(holes.render_now(request, name, kwargs))
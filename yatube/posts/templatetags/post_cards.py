@@ -0,0 +1,18 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.caching import cached_cards
+
+register = template.Library()
+
+
+def render_card(post):
+    return render_to_string('posts/includes/article.html', {'post': post})
+
+
+@register.simple_tag
+def post_cards(page_obj):
+    """Готовые карточки постов страницы из кэша фрагментов."""
+    return [mark_safe(card)
+            for card in cached_cards(list(page_obj), render_card)]
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from yatube.settings import POST_NUMBER
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='tim', first_name='Тим', last_name='Тимов')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестгруппа', slug='gsom', description='описание')
+        for number in range(POST_NUMBER + 3):
+            Post.objects.create(text=f'пост{number}', author=cls.author,
+                                group=cls.group)
+        cls.post = Post.objects.create(text='последний', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_posts_walk_by_cursor(self):
+        """Курсор проходит все посты по разу, новые сначала."""
+        url = reverse('posts:api_posts')
+        page = self.client.get(url).json()
+        ids = [row['id'] for row in page['results']]
+        self.assertEqual(len(ids), POST_NUMBER)
+        while page['next_cursor']:
+            page = self.client.get(url, {'cursor': page['next_cursor']}).json()
+            ids += [row['id'] for row in page['results']]
+        self.assertEqual(ids, list(Post.objects.values_list('pk', flat=True)))
+
+    def test_post_projection(self):
+        response = self.client.get(reverse('posts:api_posts'))
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.post.pk,
+            'text': 'последний',
+            'pub_date': response.json()['results'][0]['pub_date'],
+            'author': {'username': 'tim', 'name': 'Тим Тимов'},
+            'group': None,
+            'image': '',
+            'thumbnail': None,
+        })
+        self.assertIn('последний', response.content.decode())
+
+    def test_lists_cost_one_query_and_are_cached(self):
+        url = reverse('posts:api_group_posts', args=(self.group.slug,))
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_comment_refreshes_post(self):
+        """Комментарий сразу виден в посте и в его комментариях."""
+        post_url = reverse('posts:api_post', args=(self.post.pk,))
+        comments_url = reverse('posts:api_post_comments',
+                               args=(self.post.pk,))
+        self.assertEqual(self.client.get(post_url).json()['comments_count'],
+                         0)
+        self.client.get(comments_url)
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        self.assertEqual(self.client.get(post_url).json()['comments_count'],
+                         1)
+        self.assertEqual(
+            self.client.get(comments_url).json()['results'][0]['text'], 'к')
+
+    def test_profile_and_follow_feed(self):
+        profile = self.client.get(
+            reverse('posts:api_profile', args=('tim',))).json()
+        self.assertEqual(profile['posts_count'], POST_NUMBER + 4)
+        self.assertEqual(profile['followers_count'], 1)
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).json()['results'][0]['id'],
+                         self.post.pk)
+
+    def test_missing_objects(self):
+        for url in (reverse('posts:api_post', args=(0,)),
+                    reverse('posts:api_group_posts', args=('nope',)),
+                    reverse('posts:api_profile', args=('nope',))):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_hole_marker_in_text_stays_text(self):
+        """Метка дырки в тексте поста не заполняется в JSON."""
+        marker = '<!--hole:header:e30=-->'
+        Post.objects.create(text=marker, author=self.author)
+        url = reverse('posts:api_posts')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).json()['results'][0]['text'],
+                         marker)
@@ -1,11 +1,14 @@
-from time import sleep
+from unittest import mock
 
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import transaction
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase)
 from django.urls import reverse
 
-from posts.models import Post, User
-from yatube.settings import CACHE_TIMEOUT
+from posts import holes, views
+from posts.caching import ALL_POSTS, author_scope, post_scope, versions
+from posts.models import Comment, Follow, Group, Post, User
 
 
 class CachePagesTests(TestCase):
@@ -13,9 +16,16 @@ class CachePagesTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='tim')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестгруппа',
+            slug='gsom',
+            description='тестовое описание группы',
+        )
         cls.post1 = Post.objects.create(
             text='тестовый',
-            author=cls.user
+            author=cls.user,
+            group=cls.group,
         )
         cls.post2 = Post.objects.create(
             text='удаляемый',
@@ -24,42 +34,251 @@ class CachePagesTests(TestCase):
 
     def setUp(self):
         self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
         cache.clear()
 
-    def exp(self, response):
-        """играя с get-запросом кэшируемой страницы, заметил,
-        что в _headers есть элемент Expires. В нём указано время обращения,
-        если запрашивается информация из БД. А если запрашивается кэш,
-        то время когда кэш сформирован."""
-        return response._headers['expires'][1]
+    def test_index_page_is_cached(self):
+        """Повторный запрос главной не ходит в базу."""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post2.text)
 
-    def test_cache_timeout(self):
-        """Cache обновляется раз в CACHE_TIMEOUT секунд."""
+    def test_index_page_cache_drops_deleted_post(self):
+        """Свежеудалённый пост сразу пропадает из кэша главной."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(id=self.post2.id).delete()
         response = self.guest_client.get(reverse('posts:index'))
-        sleep(CACHE_TIMEOUT * 0.95)
-        response2 = self.guest_client.get(reverse('posts:index'))
-        sleep(CACHE_TIMEOUT * 0.1)
-        response3 = self.guest_client.get(reverse('posts:index'))
-        self.assertEqual(
-            self.exp(response), self.exp(response2), 'кэш стёрт слишком рано'
-        )
-        self.assertLess(
-            self.exp(response), self.exp(response3), 'кэш стёрт слишком поздно'
+        self.assertNotContains(response, self.post2.text)
+
+    def test_new_post_shows_up_at_once(self):
+        """Новый пост виден на всех страницах сразу после публикации."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
         )
+        for page in pages:
+            self.guest_client.get(page)
+        Post.objects.create(text='свежий', author=self.user, group=self.group)
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.guest_client.get(page), 'свежий')
+
+    def test_edit_moves_post_between_groups(self):
+        """Пост, ушедший в другую группу, пропадает со страницы старой."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.assertContains(self.guest_client.get(url), self.post1.text)
+        self.post1.group = None
+        self.post1.save()
+        self.assertNotContains(self.guest_client.get(url), self.post1.text)
+
+    def test_follow_page_follows_subscriptions(self):
+        """Лента подписок сбрасывается при подписке."""
+        url = reverse('posts:follow_index')
+        self.assertNotContains(self.reader_client.get(url), self.post1.text)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertContains(self.reader_client.get(url), self.post1.text)
+
+    def test_viewers_do_not_share_pages(self):
+        """Из общей копии страницы гость не получает чужую шапку."""
+        url = reverse('posts:index')
+        self.reader_client.get(url)
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, self.reader.username)
+        self.assertEqual(response['Vary'], 'Cookie')
+
+    def test_comment_bumps_post_version(self):
+        """Комментарий меняет версию страницы поста."""
+        before = versions([post_scope(self.post1.pk)])
+        Comment.objects.create(post=self.post1, author=self.user, text='к')
+        self.assertNotEqual(before, versions([post_scope(self.post1.pk)]))
+
+    def test_cards_are_reused_between_pages(self):
+        """Карточки не перерисовываются, пока пост не менялся."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(text='третий', author=self.user)
+        with mock.patch('posts.templatetags.post_cards.render_to_string',
+                        return_value='<article></article>') as render:
+            self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(render.call_count, 1)
 
-    def test_index_page_cache_shows_deleted_post(self):
-        """Свежеудалённый пост остаётся в cache"""
+    def test_edit_refreshes_card(self):
+        """Правка поста меняет его карточку."""
         self.guest_client.get(reverse('posts:index'))
-        Post.objects.filter(id=2).delete()
-        delete_response = self.guest_client.get(reverse('posts:index'))
-        self.assertContains(delete_response, self.post2.text)
-        """Здесь по сути то же самое. пост создан в setupslass, дальше
-        делается запрос, который создаёт кэш. Мы удаляем пост и вторым
-        запросом убеждаемся, что мы всё ещё видим информацию из кэша."""
+        post = Post.objects.get(pk=self.post2.pk)
+        post.text = 'исправленный'
+        post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'исправленный')
+        self.assertNotContains(response, 'удаляемый')
+
+    def test_group_and_author_changes_refresh_cards(self):
+        """Новый адрес группы и новое имя автора видны на карточках
+        и в уже закэшированных страницах.
+        """
+        index = reverse('posts:index')
+        self.guest_client.get(index)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        response = self.guest_client.get(index)
+        self.assertContains(response, reverse('posts:group_list',
+                                              args=('renamed',)))
+        self.assertNotContains(response, reverse('posts:group_list',
+                                                 args=('gsom',)))
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name, author.last_name = 'Тимофей', 'Новиков'
+        author.save()
+        self.assertContains(self.guest_client.get(index), 'Тимофей Новиков')
+        self.assertContains(self.guest_client.get(reverse(
+            'posts:group_list', args=('renamed',))), 'Тимофей Новиков')
+
+    def test_login_does_not_touch_cards(self):
+        """Вход пишет только last_login и карточки не трогает."""
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+
+class CommitTests(TransactionTestCase):
+    def test_versions_change_again_after_commit(self):
+        """Страница, отрисованная соседом до коммита, остаётся
+        под версией, которую после коммита уже никто не спросит.
+        """
         cache.clear()
-        clear_response = self.guest_client.get(reverse('posts:index'))
-        self.assertEqual(
-            clear_response.context['page_obj'][0].text, self.post1.text
-        )
-        """А тут проверяем, что после очистки кэша в первом объекте страницы
-        будет текст поста, предыдущего по отношению к удалённому."""
+        user = User.objects.create_user(username='tim')
+        scopes = [ALL_POSTS, author_scope(user.username)]
+        with transaction.atomic():
+            post = Post.objects.create(text='в транзакции', author=user)
+            before_commit = versions(scopes + [post_scope(post.pk)])
+        self.assertFalse(set(before_commit) & set(
+            versions(scopes + [post_scope(post.pk)])))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tim')
+        cls.post = Post.objects.create(text='тестовый', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.guest_client).get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизменная страница отвечает 304 без запросов к постам."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            again = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        again = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_changes_refresh_validators(self):
+        """Новый пост, правка и комментарий меняют ETag."""
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        index = reverse('posts:index')
+        first = {url: self.guest_client.get(url) for url in (index, detail)}
+        Post.objects.create(text='свежий', author=self.user)
+        self.assertEqual(self.revalidate(index, first[index]).status_code,
+                         200)
+        Comment.objects.create(post=self.post, author=self.user, text='к')
+        self.assertEqual(self.revalidate(detail, first[detail]).status_code,
+                         200)
+
+    def test_viewers_get_own_etags(self):
+        """ETag гостя не подходит вошедшему читателю."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.guest_client.get(url)
+        reader = Client()
+        reader.force_login(self.user)
+        self.assertEqual(self.revalidate(url, response, reader).status_code,
+                         200)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_follow_refreshes_etags_of_pages_with_buttons(self):
+        """Подписка меняет кнопку на карточках автора, поэтому старый
+        ETag лент с его постами больше не подходит.
+        """
+        reader = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(reader)
+        group = Group.objects.create(title='г', slug='g')
+        Post.objects.create(text='в группе', author=self.user, group=group)
+        urls = [reverse('posts:index'),
+                reverse('posts:group_list', args=(group.slug,))]
+        first = {url: client.get(url) for url in urls}
+        for url in urls:
+            self.assertEqual(self.revalidate(url, first[url], client)
+                             .status_code, 304)
+        client.get(reverse('posts:profile_follow', args=(self.user.username,)))
+        for url in urls:
+            response = self.revalidate(url, first[url], client)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Отписаться')
+
+
+class HolePunchingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='тестовый', author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def test_readers_share_rendered_page(self):
+        """Страница отрисовывается один раз на всех читателей."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        with mock.patch('posts.views.render', wraps=views.render) as render:
+            own = self.author_client.get(url)
+            other = self.reader_client.get(url)
+        self.assertEqual(render.call_count, 1)
+        self.assertContains(own, 'Пользователь: author')
+        self.assertNotContains(own, 'Подписаться')
+        self.assertContains(other, 'Пользователь: reader')
+        self.assertContains(other, 'Отписаться')
+
+    def test_post_page_fills_own_parts(self):
+        """Правка - только автору, форма комментария - только вошедшим."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        edit = reverse('posts:post_edit', args=(self.post.pk,))
+        comment = reverse('posts:add_comment', args=(self.post.pk,))
+        self.assertContains(self.author_client.get(url), edit)
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit)
+        self.assertContains(response, comment)
+        response = Client().get(url)
+        self.assertNotContains(response, comment)
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_follow_buttons_are_resolved_together(self):
+        """Все кнопки подписки страницы - одним запросом."""
+        others = [User.objects.create_user(username=f'other{i}')
+                  for i in range(3)]
+        content = ''.join(
+            holes.placeholder('follow_button', {
+                'author': user.pk, 'username': user.username})
+            for user in [self.author, *others])
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        with self.assertNumQueries(1):
+            html = holes.fill(request, content)
+        self.assertEqual(html.count('Отписаться'), 1)
+        self.assertEqual(html.count('Подписаться'), 3)
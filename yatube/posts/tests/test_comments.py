@@ -0,0 +1,78 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from yatube.settings import COMMENT_NUMBER
+
+EXTRA = 5
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tim')
+        cls.post = Post.objects.create(text='обсуждаемый', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'ком{number}')
+            for number in range(COMMENT_NUMBER + EXTRA))
+        cls.newest_first = list(Comment.objects.filter(
+            post=cls.post).values_list('text', flat=True))
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def more_link(self, response):
+        match = re.search(r'href="([^"]+)"[^>]*>\s*Показать ещё',
+                          response.content.decode(), re.S)
+        return match and match.group(1).replace('&amp;', '&')
+
+    def test_post_page_shows_first_batch(self):
+        """На странице поста - только первая порция, новые сначала,
+        и число комментариев без COUNT(*).
+        """
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         self.newest_first[:COMMENT_NUMBER])
+        self.assertEqual(comments[0].text, self.newest_first[0])
+        self.assertIsNotNone(self.more_link(response))
+        self.assertFalse(any('COUNT(' in query['sql'].upper()
+                             for query in queries))
+
+    def test_load_more_returns_next_batch(self):
+        """«Показать ещё» отдаёт фрагмент с остальными комментариями."""
+        page = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        fragment = self.client.get(self.more_link(page))
+        self.assertEqual(
+            [comment.text for comment in fragment.context['comments']],
+            self.newest_first[COMMENT_NUMBER:])
+        self.assertNotContains(fragment, '<html')
+        self.assertIsNone(self.more_link(fragment))
+
+    def test_load_more_as_json(self):
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        first = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(first['comments']), COMMENT_NUMBER)
+        rest = self.client.get(url, {'format': 'json',
+                                     'cursor': first['next_cursor']}).json()
+        self.assertEqual([comment['text'] for comment in rest['comments']],
+                         self.newest_first[COMMENT_NUMBER:])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_batches_are_cached_until_new_comment(self):
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.user, text='свежий')
+        self.assertContains(self.client.get(url), 'свежий')
@@ -1,8 +1,15 @@
+from io import StringIO
+from unittest import mock
+
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Post, User
+from posts import follows
+from posts.models import FeedEntry, Follow, Post, User
 
 
 class FollowTests(TestCase):
@@ -54,3 +61,167 @@ class FollowTests(TestCase):
         self.assertContains(follow_check, 'тестовый')
         unfollow_check = self.client_author.get(reverse('posts:follow_index'))
         self.assertNotContains(unfollow_check, 'тестовый')
+
+    def test_follow_page_is_materialized(self):
+        """Лента подписок хранится в FeedEntry и чинится командой."""
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        post = Post.objects.create(text='разложенный', author=self.user_author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_reader, post=post).exists())
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        response = self.client_reader.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_heavy_author_read_on_the_fly(self):
+        """Посты авторов с толпой подписчиков подмешиваются при чтении."""
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user_reader,
+                                  author=self.user_author)
+            post = Post.objects.create(text='звезда', author=self.user_author)
+            self.assertFalse(FeedEntry.objects.exists())
+            response = self.client_reader.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_author_dropping_below_limit_is_fanned_out(self):
+        """Автор, опустившийся до FEED_FANOUT_LIMIT, больше не читается
+        на лету, и его посты раскладываются всем подписчикам - и тем,
+        кто пришёл, пока он был «тяжёлым».
+        """
+        other = User.objects.create_user(username='other')
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 1):
+            Follow.objects.create(user=other, author=self.user_author)
+            Follow.objects.create(user=self.user_reader,
+                                  author=self.user_author)
+            post = Post.objects.create(text='звезда', author=self.user_author)
+            self.assertFalse(FeedEntry.objects.exists())
+            self.client_reader.get(reverse(
+                'posts:profile_unfollow', args=(self.user_author.username,)))
+            self.assertTrue(FeedEntry.objects.filter(
+                user=other, post=post).exists())
+            client = Client()
+            client.force_login(other)
+            response = client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_follow_feed_pages_by_cursor(self):
+        """Лента листается курсором по FeedEntry без COUNT(*), посты
+        «тяжёлого» автора встают между разложенными по дате.
+        """
+        star = User.objects.create_user(username='star')
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user_reader, author=star)
+        with mock.patch('posts.feed.is_heavy',
+                        lambda author_id: author_id == star.pk):
+            for number in range(8):
+                Post.objects.create(
+                    text=f'пост {number}',
+                    author=(star, self.user_author)[number % 2])
+        url = reverse('posts:follow_index')
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 0), \
+                mock.patch('posts.views.POST_NUMBER', 3):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client_reader.get(url)
+            self.assertFalse([query for query in queries
+                              if 'COUNT(' in query['sql']])
+            seen = list(response.context['page_obj'])
+            cursor = response.context['page_obj'].next_cursor
+            while cursor:
+                page = self.client_reader.get(
+                    url, {'cursor': cursor}).context['page_obj']
+                seen += page
+                cursor = page.next_cursor
+        self.assertEqual(FeedEntry.objects.count(), 4)
+        self.assertEqual(seen, list(Post.objects.all()))
+
+    def test_follow_is_idempotent(self):
+        """Повторный клик не создаёт вторую подписку и не двигает
+        счётчики, отписка от неподписанного ничего не ломает.
+        """
+        url = reverse('posts:profile_follow',
+                      args=(self.user_author.username,))
+        self.client_reader.get(url)
+        self.client_reader.get(url)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.user_author.stats.refresh_from_db()
+        self.assertEqual(self.user_author.stats.followers_count, 1)
+        unfollow = reverse('posts:profile_unfollow',
+                           args=(self.user_author.username,))
+        self.client_reader.get(unfollow)
+        self.client_reader.get(unfollow)
+        self.user_author.stats.refresh_from_db()
+        self.assertEqual(self.user_author.stats.followers_count, 0)
+
+    def test_follow_lists(self):
+        """Списки подписчиков и подписок листаются и показывают
+        кнопку подписки для смотрящего.
+        """
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        response = self.client_author.get(
+            reverse('posts:followers', args=(self.user_author.username,)))
+        self.assertEqual(response.context['users'], [self.user_reader])
+        self.assertContains(response, 'Подписаться')
+        response = self.client_author.get(
+            reverse('posts:following', args=(self.user_reader.username,)))
+        self.assertEqual(response.context['users'], [self.user_author])
+        self.assertNotContains(response, 'Подписаться')
+        self.assertEqual(self.guest_client.get(
+            reverse('posts:followers', args=('nobody',))).status_code, 404)
+
+    def test_follow_many(self):
+        """Подписка пачкой: новые подписки, счётчики, ленты, без себя,
+        уже подписанных и несуществующих.
+        """
+        authors = [User.objects.create_user(username=f'author{number}')
+                   for number in range(3)]
+        post = Post.objects.create(text='для ленты', author=authors[0])
+        Follow.objects.create(user=self.user_reader, author=authors[2])
+        usernames = [user.username for user in authors] + [
+            self.user_reader.username, 'nobody']
+        response = self.client_reader.post(
+            reverse('posts:follow_many') + '?format=json',
+            {'username': usernames})
+        self.assertEqual(response.json(),
+                         {'followed': ['author0', 'author1']})
+        self.assertEqual(Follow.objects.filter(
+            user=self.user_reader).count(), 3)
+        self.user_reader.stats.refresh_from_db()
+        self.assertEqual(self.user_reader.stats.following_count, 3)
+        authors[0].stats.refresh_from_db()
+        self.assertEqual(authors[0].stats.followers_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_reader, post=post).exists())
+        response = self.client_reader.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+        response = self.client_reader.post(reverse('posts:follow_many'),
+                                           {'username': usernames})
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        self.assertEqual(Follow.objects.filter(
+            user=self.user_reader).count(), 3)
+        self.assertEqual(self.client_reader.get(
+            reverse('posts:follow_many')).status_code, 405)
+
+    def test_follow_state_in_one_query(self):
+        authors = [User.objects.create_user(username=f'author{number}')
+                   for number in range(5)]
+        Follow.objects.create(user=self.user_reader, author=authors[1])
+        with self.assertNumQueries(1):
+            following = follows.following_ids(
+                self.user_reader, [author.pk for author in authors])
+        self.assertEqual(following, {authors[1].pk})
+
+    def test_with_follow_state(self):
+        """author_followed у каждого поста - одним запросом."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        Post.objects.create(text='свой автор', author=self.user_author)
+        Post.objects.create(text='чужой автор', author=other)
+        with self.assertNumQueries(1):
+            state = {post.text: post.author_followed for post in
+                     Post.objects.with_follow_state(self.user_reader)}
+        self.assertEqual(state, {'свой автор': True, 'чужой автор': False})
+        anonymous = self.guest_client.get(reverse('posts:index')).wsgi_request
+        self.assertFalse(any(post.author_followed for post in
+                             Post.objects.with_follow_state(anonymous.user)))
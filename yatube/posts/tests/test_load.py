@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from posts.models import Follow, Post, User
+
+
+class LoadToolsTests(TestCase):
+    def test_seed_load_is_skewed(self):
+        """Синтетика с перекосом: у самого активного автора постов
+        заметно больше, чем у среднего.
+        """
+        call_command('seed_load', '--users=50', '--groups=3', '--posts=500',
+                     '--comments=200', '--follows=200', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertTrue(Follow.objects.exists())
+        counts = sorted(User.objects.annotate(
+            total=Count('posts')).values_list('total', flat=True))
+        self.assertGreater(counts[-1], 3 * counts[len(counts) // 2])
+        self.assertEqual(
+            User.objects.order_by('-stats__posts_count').first()
+            .stats.posts_count, counts[-1])
+
+    def test_bench_views_saves_json(self):
+        """Замер пишет задержки и число запросов по каждой странице."""
+        call_command('seed_load', '--users=10', '--groups=2', '--posts=30',
+                     '--comments=10', '--follows=20', stdout=StringIO())
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        call_command('bench_views', '--requests=5', '--warmup=1',
+                     f'--output={output}', stdout=StringIO())
+        with open(output) as file:
+            views = json.load(file)['views']
+        os.remove(output)
+        self.assertEqual(set(views), {'index', 'group_posts', 'profile',
+                                      'post_detail', 'follow_index'})
+        for name, result in views.items():
+            with self.subTest(view=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -59,3 +62,42 @@ class PostModelTest(TestCase):
                                 field_type),
                         expected_value
                     )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        """Счётчики двигаются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.author, text='пост')
+        Comment.objects.create(post=post, author=self.reader, text='ком')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            list(UserStats.objects.values_list(
+                'user__username', 'posts_count',
+                'followers_count', 'following_count').order_by('user_id')),
+            [('author', 1, 1, 0), ('reader', 0, 0, 1)],
+        )
+        follow.delete()
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount чинит разъехавшиеся счётчики."""
+        post = Post.objects.create(author=self.author, text='пост')
+        Comment.objects.create(post=post, author=self.reader, text='ком')
+        UserStats.objects.update(posts_count=42)
+        Post.objects.update(comments_count=0)
+        call_command('recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).posts_count, 0)
@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.management.commands.explain_feeds import \
+    Command as ExplainCommand
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.utils import QueryBudgetMixin
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не растёт вместе с числом постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        for i in range(10):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(
+                title=f'группа{i}', slug=f'group{i}', description='...')
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(text=f'пост{i}', author=author, group=group)
+            cls.post = Post.objects.create(
+                text=f'свой{i}', author=cls.author, group=group)
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'ком{i}')
+        cls.group = group
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def test_views_query_budget(self):
+        """Страницы укладываются в бюджет запросов."""
+        # В лентах последний запрос - подписки на авторов всех карточек.
+        budgets = {
+            reverse('posts:index'): 5,
+            reverse('posts:group_list', args=(self.group.slug,)): 6,
+            reverse('posts:profile', args=(self.author.username,)): 6,
+            # Пятый - проверка ETag/Last-Modified до выборки поста.
+            reverse('posts:post_detail', args=(self.post.pk,)): 5,
+            reverse('posts:follow_index'): 6,
+            reverse('posts:search') + '?q=пост': 5,
+        }
+        for url, limit in budgets.items():
+            with self.subTest(url=url), self.assertMaxQueries(limit):
+                self.client.get(url)
+
+    def test_follow_state_query_count_is_constant(self):
+        """Кнопки подписки на карточках не добавляют запросов
+        с числом авторов на странице.
+        """
+        group = Group.objects.create(
+            title='новая', slug='new', description='...')
+        Post.objects.create(text='первый', author=self.author, group=group)
+        url = reverse('posts:group_list', args=(group.slug,))
+        with CaptureQueriesContext(connection) as one_author:
+            self.client.get(url)
+        for i in range(9):
+            author = User.objects.create_user(username=f'new{i}')
+            if i % 2:
+                Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(text=f'новый{i}', author=author, group=group)
+        cache.clear()
+        with self.assertNumQueries(len(one_author)):
+            response = self.client.get(url)
+        self.assertContains(response, 'Отписаться', count=4)
+        self.assertContains(response, 'Подписаться', count=6)
+
+        search = reverse('posts:search') + '?q=новый'
+        with CaptureQueriesContext(connection) as ten_authors:
+            response = self.client.get(search)
+        self.assertContains(response, 'Отписаться', count=4)
+        Post.objects.filter(text='новый8').delete()
+        with self.assertNumQueries(len(ten_authors)):
+            self.client.get(search)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не проходят таблицы целиком и не сортируют
+        строки мимо индекса.
+        """
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertNotIn('полный проход', out.getvalue())
+        self.assertNotIn('сортировка', out.getvalue())
+
+    def test_explain_flags_temp_b_tree(self):
+        plan = ('SEARCH posts_post USING INDEX post_group_pub_date_idx '
+                '(group_id=?)\nUSE TEMP B-TREE FOR RIGHT PART OF ORDER BY')
+        self.assertEqual(list(ExplainCommand().problems(plan)),
+                         ['сортировка мимо индекса'])
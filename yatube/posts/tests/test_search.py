@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import find_posts
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tim')
+        cls.rare = Post.objects.create(
+            text='про котов и собак', author=cls.user)
+        cls.dense = Post.objects.create(
+            text='коты, коты и снова коты', author=cls.user)
+        Post.objects.create(text='совсем о другом', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_search_ranks_and_highlights(self):
+        """Поиск находит пост по слову, лучшие результаты - первыми."""
+        response = self.client.get(reverse('posts:search'), {'q': 'коты'})
+        found = list(response.context['page_obj'])
+        self.assertEqual(found, [self.dense])
+        self.assertContains(response, '<mark>коты</mark>')
+
+    def test_prefix_and_all_words(self):
+        """Последнее слово ищется префиксом, слова - все сразу."""
+        self.assertEqual(len(find_posts('кот')), 2)
+        self.assertEqual(list(find_posts('котов соб')), [self.rare])
+        self.assertEqual(list(find_posts('котов другом')), [])
+
+    def test_text_is_escaped(self):
+        """Подсветка не пропускает разметку из текста поста."""
+        Post.objects.create(text='<b>жирный</b> кот', author=self.user)
+        response = self.client.get(reverse('posts:search'), {'q': 'жирный'})
+        self.assertContains(response, '&lt;b&gt;<mark>жирный</mark>')
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление поста сразу видны поиску."""
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'про хомяков'
+        post.save()
+        self.assertEqual(list(find_posts('хомяков')), [post])
+        self.assertEqual(list(find_posts('собак')), [])
+        post.delete()
+        self.assertEqual(list(find_posts('хомяков')), [])
+
+    def test_cursor_pages(self):
+        """Результаты листаются курсором без повторов."""
+        for number in range(5):
+            Post.objects.create(text=f'пагинация {number}', author=self.user)
+        first = find_posts('пагинация', per_page=3)
+        second = find_posts('пагинация', first.next_cursor, per_page=3)
+        self.assertEqual(len(first) + len(second), 5)
+        self.assertFalse(set(first) & set(second))
+        self.assertFalse(second.has_next())
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс после правок в обход сигналов."""
+        Post.objects.filter(pk=self.rare.pk).update(text='про ежей')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('В индексе постов: 3', out.getvalue())
+        self.assertEqual(list(find_posts('ежей')), [self.rare])
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tim')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text='с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        cache.clear()
+
+    def test_generate_stores_url(self):
+        """Миниатюра строится заранее и берётся шаблоном из поста."""
+        url = thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail, url)
+        response = Client().get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, url)
+
+    def test_generate_refreshes_cached_pages(self):
+        """Карточки и страницы, отрисованные до воркера, получают
+        миниатюру, как только он её построит.
+        """
+        urls = [reverse('posts:index'),
+                reverse('posts:post_detail', args=(self.post.pk,))]
+        for url in urls:
+            self.assertContains(Client().get(url), self.post.image.url)
+        thumbnail = thumbnails.generate(self.post.pk)
+        for url in urls:
+            self.assertContains(Client().get(url), thumbnail)
+
+    def test_pending_thumbnail_shows_original(self):
+        """Пока миниатюры нет, страница показывает сам файл
+        и не строит миниатюру при отрисовке.
+        """
+        response = Client().get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, self.post.image.url)
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.thumbnail)
+
+    def test_backfill_command(self):
+        """Команда достраивает миниатюры уже загруженных картинок."""
+        Post.objects.create(text='без картинки', author=self.user)
+        out = StringIO()
+        call_command('generate_thumbnails', '--workers=0', stdout=out)
+        self.assertIn('1 из 1', out.getvalue())
+        self.assertTrue(Post.objects.get(pk=self.post.pk).thumbnail)
+
+    def test_form_stores_dimensions(self):
+        """Форма запоминает размеры картинки, шаблону не нужен файл."""
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), {
+            'text': 'из формы',
+            'image': SimpleUploadedFile('tall.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='из формы')
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+
+    def test_fill_dimensions_command(self):
+        """Команда дописывает размеры уже загруженных картинок."""
+        out = StringIO()
+        call_command('fill_image_dimensions', '--workers=0', stdout=out)
+        self.assertIn('Размеры записаны: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1))
+
+    def test_admin_creates_post_with_dimensions(self):
+        """Админка создаёт пост с автором и размерами картинки."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_add'), {
+            'text': 'из админки',
+            'author': self.user.pk,
+            'image': SimpleUploadedFile('wide.gif', SMALL_GIF, 'image/gif'),
+        })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text='из админки')
+        self.assertEqual(post.author, self.user)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
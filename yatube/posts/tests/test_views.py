@@ -174,3 +174,21 @@ class PaginatorViewsTest(TestCase):
         for reverse_name, posts in pages_posts.items():
             response = self.authorized_client.get(reverse_name)
             self.assertEqual(len(response.context['page_obj']), posts)
+
+    def test_cursor_pages(self):
+        """Курсор листает ленту вперёд и назад без потерь и повторов."""
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url + '?cursor=испорчен')
+        first_page = first.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        second = self.authorized_client.get(
+            url + f'?cursor={first_page.next_cursor}')
+        second_page = second.context['page_obj']
+        self.assertEqual(len(second_page), 6)
+        self.assertFalse(second_page.has_next())
+        first_ids = {post.pk for post in first_page}
+        self.assertFalse(first_ids & {post.pk for post in second_page})
+        back = self.authorized_client.get(
+            url + f'?cursor={second_page.previous_cursor}')
+        self.assertEqual(list(back.context['page_obj']), list(first_page))
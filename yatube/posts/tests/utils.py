@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка «не больше N запросов» для TestCase."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            executed, limit,
+            f'{executed} запросов вместо {limit} и меньше:\n{queries}')
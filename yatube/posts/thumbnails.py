@@ -0,0 +1,85 @@
+"""Миниатюры картинок постов, заготовленные заранее.
+
+Раньше первый зритель ленты ждал, пока sorl декодирует и ужмёт каждую
+картинку прямо при отрисовке. Теперь post_create/post_edit ставят
+задачу в очередь core.jobs, воркер строит миниатюру с теми же
+параметрами, что и шаблон post_pic.html, и кладёт её адрес
+в Post.thumbnail.
+"""
+import logging
+
+from django.core.files.images import get_image_dimensions
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core import jobs
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+PORTRAIT = ('500x500', {'crop': 'center', 'upscale': False})
+LANDSCAPE = ('960x500', {'crop': 'center', 'upscale': True})
+
+
+def dimensions(image):
+    """Ширина и высота картинки по заголовку файла."""
+    with image.storage.open(image.name) as file:
+        return get_image_dimensions(file)
+
+
+def generate(post_id):
+    """Строит миниатюру поста и запоминает её адрес."""
+    post = Post.objects.filter(pk=post_id).select_related(
+        'author', 'group').only(
+        'image', 'image_width', 'image_height',
+        'author__username', 'group__slug').first()
+    if post is None or not post.image:
+        return None
+    if not post.image_width or not post.image_height:
+        post.image_width, post.image_height = dimensions(post.image)
+    portrait = post.image_height > post.image_width
+    geometry, options = PORTRAIT if portrait else LANDSCAPE
+    url = get_thumbnail(post.image, geometry, **options).url
+    # Картинку могли поменять, пока мы работали, - тогда не трогаем.
+    # Новый updated - новый ключ карточки, а версии областей сбрасывают
+    # страницы, уже отрисованные с оригиналом вместо миниатюры.
+    if Post.objects.filter(pk=post_id, image=post.image.name).update(
+            thumbnail=url,
+            image_width=post.image_width,
+            image_height=post.image_height,
+            updated=timezone.now()):
+        caching.bump(
+            caching.ALL_POSTS,
+            caching.post_scope(post_id),
+            caching.author_scope(post.author.username),
+            *([caching.group_scope(post.group.slug)] if post.group else []),
+        )
+    return url
+
+
+def generate_safely(post_id):
+    """generate(), который пишет ошибку в лог вместо исключения."""
+    try:
+        return generate(post_id)
+    except Exception:
+        logger.exception('Не удалась миниатюра поста %s', post_id)
+
+
+def generate_in_thread(post_id):
+    """generate_safely() для чужого потока: со своим соединением."""
+    close_old_connections()
+    try:
+        return generate_safely(post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """Ставит миниатюру в очередь: воркер построит её после коммита.
+    Одна ждущая задача на пост - generate() и так берёт свежую картинку.
+    """
+    if post.image:
+        jobs.enqueue(generate, post.pk, key=f'thumbnail:{post.pk}')
@@ -0,0 +1,191 @@
+"""Выгрузка и загрузка контента пачками: группы, посты, комментарии,
+подписки - по файлу на модель, в JSONL или CSV.
+
+Строки читаются и пишутся потоком, в памяти держится одна пачка.
+id сохраняются, пользователи передаются именами и заводятся при
+загрузке, если их ещё нет. Прогресс обеих команд записывается
+в файл состояния в каталоге выгрузки, поэтому прерванную команду
+можно просто запустить ещё раз.
+"""
+import csv
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+MEDIA_DIR = 'media'
+
+
+class Kind:
+    """Модель в выгрузке: имя файла и колонки. Колонки из users
+    хранят имя пользователя, а в модель идут как <колонка>_id.
+    """
+
+    def __init__(self, name, model, columns, users=()):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.users = users
+
+    def lookups(self):
+        return [f'{column}__username' if column in self.users else column
+                for column in self.columns]
+
+    def queryset(self):
+        return self.model.objects.order_by('pk').values_list(*self.lookups())
+
+    def path(self, directory, fmt):
+        return os.path.join(directory, f'{self.name}.{fmt}')
+
+    def to_python(self, row, user_ids):
+        """Строка файла -> несохранённый объект модели."""
+        values = {}
+        for column in self.columns:
+            value = row.get(column)
+            if column in self.users:
+                values[f'{column}_id'] = user_ids[value]
+                continue
+            field = self.model._meta.get_field(column)
+            if value in ('', None) and field.null:
+                value = None
+            values[field.attname] = field.to_python(value)
+        return self.model(**values)
+
+
+# В порядке зависимостей: посты ссылаются на группы, комментарии - на посты.
+KINDS = (
+    Kind('groups', Group, ('id', 'title', 'slug', 'description')),
+    Kind('posts', Post, ('id', 'text', 'pub_date', 'updated', 'author',
+                         'group_id', 'image', 'image_width', 'image_height'),
+         users=('author',)),
+    Kind('comments', Comment, ('id', 'post_id', 'author', 'text', 'created'),
+         users=('author',)),
+    Kind('follows', Follow, ('id', 'user', 'author'),
+         users=('user', 'author')),
+)
+
+
+def to_text(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+class Writer:
+    def __init__(self, path, fmt, columns, append):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8',
+                         newline='')
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == 'csv':
+            self.csv = csv.writer(self.file)
+            if not append:
+                self.csv.writerow(columns)
+
+    def write(self, values):
+        values = [to_text(value) for value in values]
+        if self.fmt == 'csv':
+            self.csv.writerow(['' if value is None else value
+                               for value in values])
+        else:
+            self.file.write(json.dumps(dict(zip(self.columns, values)),
+                                       ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def read_rows(path, fmt):
+    """Строки файла словарями, по одной."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if fmt == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_state(path, state):
+    """Пишет состояние через временный файл, чтобы не оставить обрывок."""
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(f'{path}.tmp', path)
+
+
+def user_ids(usernames):
+    """id пользователей по именам; недостающих заводит без пароля."""
+    usernames = set(usernames)
+    found = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'pk'))
+    missing = usernames - set(found)
+    if missing:
+        new = []
+        for username in missing:
+            user = User(username=username)
+            user.set_unusable_password()
+            new.append(user)
+        User.objects.bulk_create(new, ignore_conflicts=True)
+        found.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+    return found
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now/auto_now_add, чтобы даты пришли из выгрузки."""
+    fields = [Post._meta.get_field('pub_date'),
+              Post._meta.get_field('updated'),
+              Comment._meta.get_field('created')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_to_dump(name, directory):
+    """Копирует картинку из MEDIA_ROOT в выгрузку, если её там ещё нет."""
+    target = os.path.join(directory, MEDIA_DIR, name)
+    if not name or os.path.exists(target) or not default_storage.exists(
+            name):
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name) as source, open(target, 'wb') as file:
+        shutil.copyfileobj(source, file)
+    return True
+
+
+def copy_from_dump(name, directory):
+    """Кладёт картинку из выгрузки в MEDIA_ROOT под тем же именем."""
+    source = os.path.join(directory, MEDIA_DIR, name)
+    if not name or default_storage.exists(name) or not os.path.exists(
+            source):
+        return False
+    with open(source, 'rb') as file:
+        default_storage.save(name, File(file))
+    return True
@@ -1,25 +1,47 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/many/', views.follow_many, name='follow_many'),
+    path('search/', views.search, name='search'),
 
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
 
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
 
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/followers/',
+         views.followers,
+         name='followers'),
+    path('profile/<str:username>/following/',
+         views.following,
+         name='following'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'),
+
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:post_id>/', api.post, name='api_post'),
+    path('api/posts/<int:post_id>/comments/',
+         api.post_comments, name='api_post_comments'),
+    path('api/groups/', api.groups, name='api_groups'),
+    path('api/groups/<slug:slug>/posts/',
+         api.group_posts, name='api_group_posts'),
+    path('api/profiles/<str:username>/', api.profile, name='api_profile'),
+    path('api/profiles/<str:username>/posts/',
+         api.profile_posts, name='api_profile_posts'),
+    path('api/follow/', api.follow, name='api_follow'),
 ]
@@ -1,11 +1,237 @@
+import base64
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from yatube.settings import POST_NUMBER, SHALLOW_PAGES
+
+FEED_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('-created', '-id')
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder режет микросекунды, а ключу нужна точность."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и ключ записи в непрозрачный токен."""
+    raw = json.dumps([direction, values], cls=CursorEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, ValueError - если он испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw.decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(f'Некорректный курсор: {token!r}')
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise ValueError(f'Некорректный курсор: {token!r}')
+    return direction, values
+
+
+class CursorPage(Sequence):
+    """Страница, открытая по курсору: без COUNT(*) и без OFFSET."""
+    cursor_mode = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self)} записей>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация: следующая страница ищется по ключу
+    последней записи, поэтому глубина страницы не влияет на цену запроса.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    @staticmethod
+    def value(obj, name):
+        # Строки values() - словари, остальное - модели.
+        if isinstance(obj, dict):
+            return obj[name]
+        return getattr(obj, name)
+
+    def key(self, obj):
+        return [self.value(obj, name) for name in self.fields]
+
+    def cursor(self, direction, obj):
+        return encode_cursor(direction, self.key(obj))
+
+    def _parse(self, values):
+        if len(values) != len(self.fields):
+            raise ValueError('Ключ курсора не совпадает с сортировкой')
+        meta = self.object_list.model._meta
+        return [meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)]
+
+    def _beyond(self, values, direction):
+        """Условие «строго после ключа» в заданном направлении обхода.
+
+        Нестрогая граница по первому полю дублирует цепочку OR, но без
+        неё база не сможет начать чтение индекса прямо с курсора.
+        """
+        condition = Q()
+        equal = {}
+        for order, name, value in zip(self.ordering, self.fields, values):
+            descending = order.startswith('-')
+            lookup = 'lt' if descending == (direction == NEXT) else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            if not equal:
+                bound = Q(**{f'{name}__{lookup}e': value})
+            equal[name] = value
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering]
+
+    def _window(self, condition, ordering):
+        """per_page строк за курсором и есть ли дальше ещё."""
+        rows = list(self.object_list.filter(condition).order_by(
+            *ordering)[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def first_page(self):
+        rows, has_more = self._window(Q(), self.ordering)
+        next_cursor = self.cursor(NEXT, rows[-1]) if has_more else None
+        return CursorPage(rows, next_cursor=next_cursor)
+
+    def get_page(self, token):
+        """Возвращает страницу по токену; испорченный токен - первая."""
+        try:
+            direction, values = decode_cursor(token)
+            values = self._parse(values)
+        except (ValueError, ValidationError):
+            return self.first_page()
+        condition = self._beyond(values, direction)
+        if direction == NEXT:
+            rows, has_more = self._window(condition, self.ordering)
+            return CursorPage(
+                rows,
+                next_cursor=(self.cursor(NEXT, rows[-1])
+                             if has_more else None),
+                previous_cursor=(self.cursor(PREVIOUS, rows[0])
+                                 if rows else None),
+            )
+        rows, has_more = self._window(condition, self._reversed_ordering())
+        rows.reverse()
+        return CursorPage(
+            rows,
+            next_cursor=self.cursor(NEXT, rows[-1]) if rows else None,
+            previous_cursor=(self.cursor(PREVIOUS, rows[0])
+                             if has_more else None),
+        )
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсор по нескольким выборкам с одним ключом сортировки: из каждой
+    берётся окно в per_page + 1 строк за курсором, окна сливаются
+    в одно, лишнее отбрасывается. Ни одна выборка не читается дальше
+    своего окна.
+    """
+
+    def __init__(self, sources, per_page, ordering=FEED_ORDERING):
+        super().__init__(sources[0], per_page, ordering)
+        self.sources = sources
+
+    def _window(self, condition, ordering):
+        rows = {}
+        for source in self.sources:
+            for row in source.filter(condition).order_by(
+                    *ordering)[:self.per_page + 1]:
+                # Одна запись может найтись в двух выборках.
+                rows.setdefault(tuple(self.key(row)), row)
+        rows = list(rows.values())
+        # Устойчивая сортировка с младшего поля ключа к старшему.
+        for order, name in reversed(list(zip(ordering, self.fields))):
+            rows.sort(key=lambda row: self.value(row, name),
+                      reverse=order.startswith('-'))
+        return rows[:self.per_page], len(rows) > self.per_page
+
+
+class FeedPaginator(Paginator):
+    """Обычный постраничный вывод, но ссылки с номерами -
+    только на первые SHALLOW_PAGES страниц, дальше листаем курсором.
+    """
+
+    @property
+    def shallow_range(self):
+        return self.page_range[:SHALLOW_PAGES]
+
+    @property
+    def has_deep_pages(self):
+        return self.num_pages > SHALLOW_PAGES
+
+
+class WindowPaginator(FeedPaginator):
+    """Первая страница курсора в виде обычной Page. Сколько записей
+    всего, неизвестно и не считается: известно лишь, есть ли дальше
+    ещё, и туда ведёт курсор, а не номер страницы.
+    """
+    shallow_range = range(1, 2)
+    has_deep_pages = True
+
+    def __init__(self, page, per_page):
+        super().__init__(list(page), per_page)
+        self.next_cursor = page.next_cursor
+
+    @property
+    def count(self):
+        return len(self.object_list) + (self.next_cursor is not None)
 
-from yatube.settings import POST_NUMBER
+    def first_page(self):
+        page = self.page(1)
+        page.next_cursor = self.next_cursor
+        return page
 
 
-def paginate(obj, request):
+def paginate(obj, request, ordering=FEED_ORDERING, per_page=POST_NUMBER):
     """Нарезает длинную последоваельность постов на страницы."""
-    paginator = Paginator(obj, POST_NUMBER)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return CursorPaginator(obj, per_page, ordering).get_page(cursor)
+    paginator = FeedPaginator(obj, per_page)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    if page_obj.number >= SHALLOW_PAGES and page_obj.has_next():
+        page_obj.next_cursor = CursorPaginator(
+            obj, per_page, ordering).cursor(NEXT, page_obj[-1])
     return page_obj
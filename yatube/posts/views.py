@@ -1,54 +1,118 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
-from yatube.settings import CACHE_TIMEOUT
+from core.replicas import use_primary
+from yatube.settings import (COMMENT_NUMBER, FOLLOW_BULK_LIMIT,
+                             FOLLOW_LIST_NUMBER, POST_NUMBER)
 
+from . import follows, thumbnails
+from .caching import (ALL_POSTS, author_scope, cached_page, conditional,
+                      follow_scope, group_scope, post_scope)
+from .feed import feed_page
 from .forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
-from .utils import paginate
+from posts.models import Comment, Follow, Group, Post, User
+from .search import find_posts
+from .utils import (COMMENT_ORDERING, CursorPaginator, WindowPaginator,
+                    paginate)
 
 
-@cache_page(CACHE_TIMEOUT, key_prefix='index_page')
+@conditional(ALL_POSTS, follow_scope('{user}'))
+@cached_page(ALL_POSTS)
 def index(request):
     """Главная - со списком всех блогозаписей."""
-    posts = Post.objects.select_related('author', 'group').all()
+    posts = Post.objects.for_feed()
     page_obj = paginate(posts, request)
     return render(request, 'posts/index.html', {
         'page_obj': page_obj, 'index': True})
 
 
+@conditional(group_scope('{slug}'), follow_scope('{user}'))
+@cached_page(group_scope('{slug}'))
 def group_posts(request, slug):
     """Блогозаписи любого сообщества."""
     selected_group = get_object_or_404(Group, slug=slug)
-    post_list = selected_group.posts.select_related('author', 'group').all()
+    post_list = selected_group.posts.for_feed()
     page_obj = paginate(post_list, request)
     return render(request, 'posts/group_list.html', {
         'group': selected_group, 'page_obj': page_obj})
 
 
+@conditional(author_scope('{username}'), follow_scope('{user}'))
+@cached_page(author_scope('{username}'))
 def profile(request, username):
     """Блогозаписи интернет-мыслителя."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author', 'group').all()
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    post_list = author.posts.for_feed()
     page_obj = paginate(post_list, request)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
     return render(request, 'posts/profile.html', {
-        'author': author, 'page_obj': page_obj, 'following': following})
+        'author': author, 'page_obj': page_obj})
 
 
+def search(request):
+    """Поиск блогозаписей по тексту."""
+    query = request.GET.get('q', '').strip()
+    page_obj = find_posts(query, request.GET.get('cursor'),
+                          user=request.user)
+    return render(request, 'posts/search.html', {
+        'query': query, 'page_obj': page_obj})
+
+
+def post_state(request, post_id):
+    """Что на странице поста не покрыто его областью: время правки
+    и число постов автора. Комментарии двигают версию области.
+    """
+    return Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__stats__posts_count').first() or ()
+
+
+def comment_page(post_id, token=None):
+    """Порция комментариев поста, новые сначала, листается курсором."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENT_NUMBER, COMMENT_ORDERING)
+    return paginator.get_page(token) if token else paginator.first_page()
+
+
+@conditional(post_scope('{post_id}'), state=post_state)
+@cached_page(post_scope('{post_id}'), state=post_state)
 def post_detail(request, post_id):
     """Страничка блогозаписи."""
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related('author').all()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    comments = comment_page(post_id)
     form = CommentForm()
     return render(request,
                   'posts/post_detail.html',
                   {'post': post, 'form': form, 'comments': comments})
 
 
+@conditional(post_scope('{post_id}'))
+@cached_page(post_scope('{post_id}'))
+def post_comments(request, post_id):
+    """Следующая порция комментариев к «Показать ещё»: HTML-фрагмент,
+    а с ?format=json - JSON.
+    """
+    comments = comment_page(post_id, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            } for comment in comments],
+            'next_cursor': comments.next_cursor,
+        })
+    return render(request, 'posts/includes/comments.html', {
+        'post_id': post_id, 'comments': comments})
+
+
 @login_required
+@use_primary
+@transaction.atomic
 def post_create(request):
     """Создать блогозапись."""
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -57,13 +121,16 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author = request.user
     new_post.save()
+    thumbnails.schedule(new_post)
     return redirect('posts:profile', request.user.username)
 
 
 @login_required
+@use_primary
+@transaction.atomic
 def post_edit(request, post_id):
     """Изменение блогозаписи."""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id=post.pk)
     form = PostForm(request.POST or None,
@@ -72,11 +139,18 @@ def post_edit(request, post_id):
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {
             'form': form, 'is_edit': True, 'post_id': post_id})
-    form.save()
+    post = form.save(commit=False)
+    if 'image' in form.changed_data:
+        post.thumbnail = ''
+    post.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
     return redirect('posts:post_detail', post_id=post.pk)
 
 
 @login_required
+@use_primary
+@transaction.atomic
 def add_comment(request, post_id):
     """Добавление замечания."""
     form = CommentForm(request.POST or None)
@@ -89,31 +163,84 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional(ALL_POSTS, follow_scope('{user}'))
+@cached_page(ALL_POSTS, follow_scope('{user}'))
 def follow_index(request):
     """Блогозаписи из подписок."""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate(post_list, request)
+    cursor = request.GET.get('cursor')
+    page_obj = feed_page(request.user, cursor, per_page=POST_NUMBER)
+    if not cursor:
+        page_obj = WindowPaginator(page_obj, POST_NUMBER).first_page()
     return render(request, 'posts/index.html', {
         'page_obj': page_obj, 'follow': True})
 
 
 @login_required
+@use_primary
+@transaction.atomic
 def profile_follow(request, username):
     """Добавить подписку."""
-    author = get_object_or_404(User, username=username)
-    if request.user == author:
-        return redirect('posts:profile', username)
-    qs = Follow.objects.filter(user=request.user, author=author)
-    if not qs.exists():
-        Follow.objects.create(user=request.user, author=author)
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@use_primary
+@transaction.atomic
 def profile_unfollow(request, username):
     """Убрать подписку."""
-    author = get_object_or_404(User, username=username)
-    qs = Follow.objects.filter(user=request.user, author=author)
-    if qs.exists():
-        qs.delete()
+    Follow.objects.filter(
+        user=request.user, author__username=username).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+@use_primary
+@transaction.atomic
+def follow_many(request):
+    """Подписка сразу на многих авторов (username=...&username=...),
+    например при знакомстве с сайтом. С ?format=json - JSON
+    со списком новых подписок вместо редиректа в ленту.
+    """
+    usernames = request.POST.getlist('username')[:FOLLOW_BULK_LIMIT]
+    authors = User.objects.filter(username__in=usernames).only(
+        'pk', 'username')
+    followed = follows.follow_many(request.user, authors)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(
+            {'followed': [author.username for author in followed]})
+    return redirect('posts:follow_index')
+
+
+def follow_list(request, username, side, shown):
+    """Страница подписок автора: side - его поле в Follow,
+    shown - поле тех, кого показываем.
+    """
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    rows = Follow.objects.filter(**{side: author}).select_related(
+        shown).order_by('-id')
+    page_obj = paginate(rows, request, ('-id',), FOLLOW_LIST_NUMBER)
+    return render(request, 'posts/follow_list.html', {
+        'author': author,
+        'followers': shown == 'user',
+        'page_obj': page_obj,
+        'users': [getattr(row, shown) for row in page_obj],
+    })
+
+
+@conditional(author_scope('{username}'), follow_scope('{user}'))
+@cached_page(author_scope('{username}'))
+def followers(request, username):
+    """Подписчики автора, новые сначала."""
+    return follow_list(request, username, 'author', 'user')
+
+
+@conditional(author_scope('{username}'), follow_scope('{user}'))
+@cached_page(author_scope('{username}'))
+def following(request, username):
+    """На кого подписан автор, новые подписки сначала."""
+    return follow_list(request, username, 'user', 'author')
@@ -0,0 +1,199 @@
+"""ASGI-вход для Django 2.2, у которой своего ASGI ещё нет.
+
+Асинхронная обёртка сама читает тело запроса и отдаёт ответ клиенту,
+а в пул из ASGI_THREADS потоков уходит только работа Django: view,
+шаблоны и запросы к базе. Ответ Django собирается в пуле целиком
+(и StreamingHttpResponse тоже) и только потом отправляется, поэтому
+медленный клиент держит дешёвую корутину, а не поток с соединением
+к базе. Файлы из MEDIA_URL при DEBUG отдаются здесь же, мимо пула,
+кусками.
+
+Запуск: uvicorn yatube.asgi:application (или daphne, hypercorn).
+"""
+import asyncio
+import mimetypes
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.wsgi import get_wsgi_application
+from django.utils._os import safe_join
+
+from yatube.settings import ASGI_THREADS, DEBUG, MEDIA_ROOT, MEDIA_URL
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+CHUNK = 64 * 1024
+# Тело запроса больше этого пишется во временный файл,
+# как у Django с FILE_UPLOAD_MAX_MEMORY_SIZE.
+SPOOL_SIZE = 2621440
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения и ограниченного пула."""
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.threads = threads
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads,
+                                            thread_name_prefix='django')
+        return self._pool
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Соединения {scope["type"]} не поддерживаются')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            media = self.media_file(scope)
+            if media:
+                return await self.send_file(media, scope['method'], send)
+            status, headers, chunks = await loop.run_in_executor(
+                self.pool, self.run_wsgi, self.environ(scope, body))
+        finally:
+            body.close()
+        if scope['method'] == 'HEAD':
+            chunks = []
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        for number, chunk in enumerate(chunks, 1):
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': number < len(chunks)})
+        if not chunks:
+            await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._pool is not None:
+                    self._pool.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса целиком; None - клиент ушёл, не дослав его.
+        Большие загрузки уходят с памяти на диск, как у Django.
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+
+    def environ(self, scope, body):
+        # WSGI хочет байты пути и строки запроса как строку latin-1.
+        root = scope.get('root_path', '')
+        path = scope['path']
+        if root and path.startswith(root):
+            path = path[len(root):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root.encode().decode('latin-1'),
+            'PATH_INFO': path.encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            if key in environ:
+                # Куки HTTP/2 приходят отдельными заголовками, и склеивать
+                # их надо через «; », а не через запятую.
+                separator = '; ' if key == 'HTTP_COOKIE' else ','
+                value = f'{environ[key]}{separator}{value}'
+            environ[key] = value
+        return environ
+
+    def run_wsgi(self, environ):
+        """Запрос целиком через Django - в потоке пула. Тело ответа
+        собирается в список кусков, отправит его уже корутина.
+        """
+        response, chunks = {}, []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers]
+            return chunks.append
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            chunks.extend(chunk for chunk in result if chunk)
+        finally:
+            # Здесь Django шлёт request_finished и закрывает соединения.
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], chunks
+
+    def media_file(self, scope):
+        if not DEBUG or scope['method'] not in ('GET', 'HEAD') \
+                or not scope['path'].startswith(MEDIA_URL):
+            return None
+        try:
+            path = safe_join(MEDIA_ROOT, scope['path'][len(MEDIA_URL):])
+        except SuspiciousFileOperation:
+            return None
+        return path if os.path.isfile(path) else None
+
+    async def send_file(self, path, method, send):
+        loop = asyncio.get_running_loop()
+        content_type, encoding = mimetypes.guess_type(path)
+        headers = [
+            (b'content-type',
+             (content_type or 'application/octet-stream').encode()),
+            (b'content-length', str(os.path.getsize(path)).encode()),
+        ]
+        if encoding:
+            headers.append((b'content-encoding', encoding.encode()))
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': headers})
+        if method == 'HEAD':
+            return await send({'type': 'http.response.body', 'body': b''})
+        with open(path, 'rb') as file:
+            while True:
+                # Чтение с диска - в общем пуле asyncio, не в пуле Django.
+                chunk = await loop.run_in_executor(None, file.read, CHUNK)
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': bool(chunk)})
+                if not chunk:
+                    return
+
+
+application = WsgiToAsgi(get_wsgi_application(), ASGI_THREADS)
@@ -5,6 +5,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 POST_NUMBER = 10
+# Сколько комментариев показывать на странице поста и подгружать за раз.
+COMMENT_NUMBER = 20
+
+# Сколько первых страниц ленты листаются по номеру (?page=N),
+# дальше - только курсором (?cursor=...).
+SHALLOW_PAGES = 5
+
+# Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+# не раскладываются по лентам, а читаются при открытии ленты.
+FEED_FANOUT_LIMIT = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+FEED_BACKFILL = 500
+# На скольких авторов можно подписаться одним запросом (онбординг).
+FOLLOW_BULK_LIMIT = 50
+# Сколько подписчиков или подписок на странице списка.
+FOLLOW_LIST_NUMBER = 50
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -48,6 +64,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +82,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +98,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# yatube.asgi: сколько потоков выполняют Django под ASGI-сервером.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
 
 DATABASES = {
     'default': {
@@ -87,11 +108,78 @@ DATABASES = {
     }
 }
 
-CACHES = {'default':
-          {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
-          }
+# Реплики только для чтения: пути к копиям базы через запятую
+# (DATABASE_REPLICA_PATHS=/srv/replica1.sqlite3,/srv/replica2.sqlite3).
+# Копии обновляет manage.py sync_replicas. В тестах реплики смотрят
+# в тестовую default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.getenv(
+        'DATABASE_REPLICA_PATHS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# DB_PROFILE=production: WAL, synchronous=NORMAL и прочие PRAGMA
+# из core.sqlite на каждом соединении, транзакции atomic с BEGIN
+# IMMEDIATE и постоянные соединения на DB_CONN_MAX_AGE секунд
+# вместо нового на каждый запрос.
+DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+if DB_PROFILE == 'production':
+    for database in DATABASES.values():
+        database['ENGINE'] = 'core.backends.sqlite3'
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 600))
+# Сколько секунд после записи читатель читает из default.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_COOKIE = 'primary'
+
+# CACHE_BACKEND: locmem - кэш в памяти процесса (по умолчанию),
+# file или db - общий для всех воркеров кэш без внешних сервисов,
+# tiered - L1 в памяти процесса поверх общего L2 (CACHE_SHARED).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_SHARED = os.getenv('CACHE_SHARED', 'file')
+SHARED_CACHES = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.getenv('CACHE_TABLE', 'yatube_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+LOCAL_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+if CACHE_BACKEND == 'tiered':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'OPTIONS': {
+                'L1': 'local',
+                'L2': 'shared',
+                'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', 5)),
+                'L1_BYPASS': ('version:',),
+            },
+        },
+        'local': LOCAL_CACHE,
+        'shared': SHARED_CACHES[CACHE_SHARED],
+    }
+elif CACHE_BACKEND in SHARED_CACHES:
+    CACHES = {'default': SHARED_CACHES[CACHE_BACKEND]}
+else:
+    CACHES = {'default': LOCAL_CACHE}
 
-CACHE_TIMEOUT = 20
+# Страницы лент сбрасываются сигналами при изменениях (posts.caching),
+# таймаут лишь подчищает копии, до которых больше никто не дойдёт.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Отрисованные карточки постов: ключ меняется при каждой правке поста.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -117,5 +205,36 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Сколько потоков у команд generate_thumbnails и fill_image_dimensions;
+# 0 - всё в одном потоке. Новые миниатюры строит очередь core.jobs.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+# Фоновые задачи (core.jobs): их выполняет manage.py run_workers.
+# JOBS_ALWAYS_EAGER=1 - сразу при постановке, без воркеров.
+# Воркерам нужен общий кэш (CACHE_BACKEND не locmem), см. core.apps.
+JOBS_ALWAYS_EAGER = os.getenv('JOBS_ALWAYS_EAGER', '1' if DEBUG else '') == '1'
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_ATTEMPTS = 5
+# Пауза перед повтором удваивается с каждой попыткой до потолка.
+JOB_BACKOFF_SECONDS = 10
+JOB_BACKOFF_MAX_SECONDS = 60 * 60
+# Сколько воркер держит взятую задачу; потом её может взять другой.
+JOB_LEASE_SECONDS = 5 * 60
+
+# /metrics отдаётся персоналу или по заголовку Authorization: Bearer <токен>.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Запросы дольше этого пишутся в лог yatube.slow с самыми долгими SQL.
+METRICS_SLOW_MS = int(os.getenv('METRICS_SLOW_MS', 500))
+METRICS_TOP_QUERIES = 5
+
+# Выборочное профилирование (core.middleware.ProfilingMiddleware):
+# доля случайных запросов и порог, дольше которого профиль пишется всегда.
+PROFILING = os.getenv('PROFILING', '') == '1'
+PROFILING_RATE = float(os.getenv('PROFILING_RATE', 0.01))
+PROFILING_THRESHOLD_MS = int(os.getenv('PROFILING_THRESHOLD_MS', 1000))
+PROFILING_INTERVAL_MS = int(os.getenv('PROFILING_INTERVAL_MS', 5))
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_BYTES = int(os.getenv('PROFILING_MAX_BYTES', 50 * 1024 * 1024))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')